@@ -0,0 +1,236 @@
+function showTab(tab) {
+    // Update tabs
+    document.querySelectorAll('.tab').forEach(t => t.classList.remove('active'));
+    event.target.classList.add('active');
+
+    // Update sections
+    document.querySelectorAll('.content-section').forEach(s => s.classList.remove('active'));
+    document.getElementById(tab + '-section').classList.add('active');
+}
+
+function showToast(message, type) {
+    const toast = document.getElementById('toast');
+    toast.textContent = message;
+    toast.className = 'toast ' + type;
+    toast.style.display = 'block';
+    setTimeout(() => { toast.style.display = 'none'; }, 3000);
+}
+
+async function printLabel(path, btn) {
+    if (btn) {
+        btn.disabled = true;
+        btn.textContent = '⏳';
+    }
+    try {
+        const response = await fetch('/print/' + path, { method: 'POST' });
+        const data = await response.json();
+        if (data.success) {
+            showToast('✅ Sent to printer!', 'success');
+            if (btn) btn.closest('.label-card').classList.add('printed');
+        } else {
+            showToast('❌ ' + data.error, 'error');
+        }
+    } catch (e) {
+        showToast('❌ Error: ' + e.message, 'error');
+    }
+    if (btn) {
+        btn.disabled = false;
+        btn.textContent = '🖨️ Print';
+    }
+}
+
+async function archiveLabel(path) {
+    try {
+        const response = await fetch('/archive/' + path, { method: 'POST' });
+        const data = await response.json();
+        if (data.success) {
+            showToast('📦 Archived!', 'success');
+            setTimeout(() => location.reload(), 500);
+        } else {
+            showToast('❌ ' + data.error, 'error');
+        }
+    } catch (e) {
+        showToast('❌ Error: ' + e.message, 'error');
+    }
+}
+
+async function restoreLabel(path) {
+    try {
+        const response = await fetch('/restore/' + path, { method: 'POST' });
+        const data = await response.json();
+        if (data.success) {
+            showToast('↩️ Restored!', 'success');
+            setTimeout(() => location.reload(), 500);
+        } else {
+            showToast('❌ ' + data.error, 'error');
+        }
+    } catch (e) {
+        showToast('❌ Error: ' + e.message, 'error');
+    }
+}
+
+async function printAllInGroup(date) {
+    const cards = [...document.querySelectorAll(`.label-card[data-date="${date}"]`)];
+    const buttons = cards.map(card => card.querySelector('.btn-print'));
+    showToast(`🖨️ Printing ${cards.length} labels...`, 'success');
+    buttons.forEach(btn => { btn.disabled = true; btn.textContent = '⏳'; });
+
+    // One request (and one lp job) for the whole group
+    try {
+        const response = await fetch('/print-batch', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ paths: cards.map(card => card.dataset.path) })
+        });
+        const data = await response.json();
+        if (data.success) {
+            showToast(`✅ ${cards.length} labels sent to printer!`, 'success');
+            cards.forEach(card => card.classList.add('printed'));
+        } else {
+            showToast('❌ ' + data.error, 'error');
+        }
+    } catch (e) {
+        showToast('❌ Error: ' + e.message, 'error');
+    }
+
+    buttons.forEach(btn => { btn.disabled = false; btn.textContent = '🖨️ Print'; });
+}
+
+async function archiveAllInGroup(date) {
+    const cards = document.querySelectorAll(`.label-card[data-date="${date}"]`);
+    if (!confirm(`Archive all ${cards.length} labels from ${date}?`)) return;
+
+    showToast(`📦 Archiving ${cards.length} labels...`, 'success');
+
+    // Each archive changes the labels version; don't let the resulting
+    // /events reload cut the loop short
+    bulkInProgress = true;
+    for (const card of cards) {
+        const path = card.dataset.path;
+        try {
+            await fetch('/archive/' + path, { method: 'POST' });
+        } catch (e) {}
+    }
+    bulkInProgress = false;
+
+    setTimeout(() => location.reload(), 500);
+}
+
+// Edit label functions
+async function editLabel(path, sku) {
+    try {
+        const response = await fetch('/api/label-data/' + path);
+        const data = await response.json();
+
+        if (data.success && data.data) {
+            // Check if we have full data or just SKU
+            if (data.data.brand || data.data.largeur) {
+                populateEditForm(path, data.data);
+            } else {
+                // Only have SKU - show message
+                populateEditForm(path, data.data);
+                showToast('⚠️ No saved data for this label - fill in details to save', 'warning');
+            }
+        } else {
+            populateEditForm(path, { sku: sku });
+            showToast('⚠️ No saved data for this label - fill in details to save', 'warning');
+        }
+    } catch (e) {
+        populateEditForm(path, { sku: sku });
+    }
+
+    document.getElementById('editModal').style.display = 'flex';
+}
+
+function populateEditForm(path, data) {
+    document.getElementById('editPath').value = path;
+    document.getElementById('editBrand').value = data.brand || '';
+    document.getElementById('editModel').value = data.model || '';
+    document.getElementById('editLargeur').value = data.largeur || '';
+    document.getElementById('editHauteur').value = data.hauteur || '';
+    document.getElementById('editRayon').value = (data.rayon || '').toString().replace('R', '').replace('r', '');
+    document.getElementById('editSku').value = data.sku || '';
+    document.getElementById('editIndiceCharge').value = data.indice_charge || '';
+    document.getElementById('editIndiceVitesse').value = data.indice_vitesse || '';
+    document.getElementById('editDot').value = data.dot || '';
+    document.getElementById('editProfondeur').value = data.profondeur || '';
+}
+
+function closeEditModal() {
+    document.getElementById('editModal').style.display = 'none';
+    if (reloadPending) location.reload();
+}
+
+async function saveLabel(event) {
+    event.preventDefault();
+
+    const btn = document.getElementById('saveBtn');
+    btn.disabled = true;
+    btn.textContent = '⏳ Saving...';
+
+    const formData = {
+        path: document.getElementById('editPath').value,
+        brand: document.getElementById('editBrand').value,
+        model: document.getElementById('editModel').value,
+        largeur: document.getElementById('editLargeur').value,
+        hauteur: document.getElementById('editHauteur').value,
+        rayon: document.getElementById('editRayon').value,
+        sku: document.getElementById('editSku').value,
+        indice_charge: document.getElementById('editIndiceCharge').value,
+        indice_vitesse: document.getElementById('editIndiceVitesse').value,
+        dot: document.getElementById('editDot').value,
+        profondeur: document.getElementById('editProfondeur').value
+    };
+
+    try {
+        const response = await fetch('/api/regenerate-label', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(formData)
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            closeEditModal();
+            showToast('✅ Label regenerated!', 'success');
+            window.open('/view/' + data.path, '_blank');
+            setTimeout(() => location.reload(), 500);
+        } else {
+            showToast('❌ ' + data.error, 'error');
+        }
+    } catch (e) {
+        showToast('❌ Error: ' + e.message, 'error');
+    }
+
+    btn.disabled = false;
+    btn.textContent = '💾 Save & Regenerate';
+}
+
+// Close modal on backdrop click (attached after DOM load)
+document.addEventListener('DOMContentLoaded', function() {
+    document.getElementById('editModal').addEventListener('click', function(e) {
+        if (e.target === this) closeEditModal();
+    });
+});
+
+// Close on Escape
+document.addEventListener('keydown', function(e) {
+    if (e.key === 'Escape') closeEditModal();
+});
+
+// Live refresh: the server pushes the label folders' version whenever
+// it changes; reload only then, and not while the edit modal is open or a
+// bulk archive is still running
+const pageVersion = document.body.dataset.labelsVersion;
+let reloadPending = false;
+let bulkInProgress = false;
+new EventSource('/events').onmessage = function(event) {
+    if (event.data === pageVersion) return;
+    const modal = document.getElementById('editModal');
+    if (!bulkInProgress && (!modal || modal.style.display === 'none' || modal.style.display === '')) {
+        location.reload();
+    } else {
+        reloadPending = true;
+    }
+};
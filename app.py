@@ -1,10 +1,23 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Request, Response, render_template, request, jsonify, redirect, url_for
 import shopify
 import os
+import sys
 import json
+import orjson
+import base64
+import io
+import re
+import threading
+import atexit
+import logging
+import queue
 import urllib.request
 import urllib.error
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
 from label_printer import TireLabelPrinter
@@ -12,6 +25,14 @@ from label_printer import TireLabelPrinter
 # Load environment variables
 load_dotenv()
 
+# Log records are only queued by the thread that logs them; a background
+# listener thread does the actual writing to stdout
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
+log_listener.start()
+atexit.register(log_listener.stop)
+
 # SmartPneu Database API config
 DATABASE_API_URL = os.environ.get("DATABASE_API_URL", "")  # e.g. https://smartpneu-database.up.railway.app
 DATABASE_API_KEY = os.environ.get("DATABASE_API_KEY", "")
@@ -28,7 +49,7 @@ def fetch_tire_database():
             req = urllib.request.Request(url)
             req.add_header("X-API-Key", DATABASE_API_KEY)
             with urllib.request.urlopen(req, timeout=5) as resp:
-                data = json.loads(resp.read().decode("utf-8"))
+                data = orjson.loads(resp.read())
             if "brands" in data:
                 print(f"✅ Loaded database from SmartPneu Database API: {len(data['brands'])} brands")
                 return data
@@ -38,8 +59,8 @@ def fetch_tire_database():
 
     # Fallback: local file
     try:
-        with open("brands_models.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with open("brands_models.json", "rb") as f:
+            data = orjson.loads(f.read())
         print(f"📁 Loaded database from local file: {len(data.get('brands', []))} brands")
         return data
     except FileNotFoundError:
@@ -55,7 +76,7 @@ def fetch_model_details(brand, model):
             req = urllib.request.Request(url)
             req.add_header("X-API-Key", DATABASE_API_KEY)
             with urllib.request.urlopen(req, timeout=5) as resp:
-                result = json.loads(resp.read().decode("utf-8"))
+                result = orjson.loads(resp.read())
             if result.get("success"):
                 return result["model"]
         except Exception as e:
@@ -63,8 +84,8 @@ def fetch_model_details(brand, model):
 
     # Fallback: local file
     try:
-        with open("brands_models.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with open("brands_models.json", "rb") as f:
+            data = orjson.loads(f.read())
         for brand_data in data["brands"]:
             if brand_data["name"] == brand:
                 for model_data in brand_data["models"]:
@@ -98,7 +119,7 @@ def get_all_publications():
     """
     
     result = shopify.GraphQL().execute(query)
-    data = json.loads(result)
+    data = orjson.loads(result)
     
     if 'errors' in data:
         print(f"❌ Error fetching publications: {data['errors']}")
@@ -176,7 +197,7 @@ def publish_product_to_all_channels(product_id):
         }
         
         result = shopify.GraphQL().execute(mutation, variables=variables)
-        data = json.loads(result)
+        data = orjson.loads(result)
         
         if 'errors' in data:
             results.append({
@@ -218,8 +239,20 @@ print(f"SHOPIFY_ACCESS_TOKEN: {os.getenv('SHOPIFY_ACCESS_TOKEN')[:15]}...") # On
 print(f"SHOP_URL will be: https://{os.getenv('SHOPIFY_STORE')}.myshopify.com")
 print("=" * 50)
 
+
+class InMemoryUploadRequest(Request):
+    """
+    Keep uploaded files in memory instead of letting Werkzeug spool anything
+    over 500KB to a temporary file that is then read straight back.
+    Uploads are bounded by MAX_CONTENT_LENGTH.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
+
 # CREATE THE APP FIRST! ← This must come before @app.route
 app = Flask(__name__)
+app.request_class = InMemoryUploadRequest
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
@@ -233,17 +266,31 @@ PRINTER_NAME = os.getenv('PRINTER_NAME', 'HP_Color_LaserJet_MFP_M179fnw')
 AUTO_PRINT_LABELS = os.getenv('AUTO_PRINT_LABELS', 'true').lower() == 'true'
 PRINT_BLACK_AND_WHITE = os.getenv('PRINT_BLACK_AND_WHITE', 'true').lower() == 'true'
 
+# Parallel Shopify writes per product (kept low for the REST rate limit)
+METAFIELD_WORKERS = 4
+
 # Initialize label printer (B&W mode for testing)
 label_printer = TireLabelPrinter(printer_name=PRINTER_NAME, black_and_white=PRINT_BLACK_AND_WHITE)
 
 # Initialize Shopify session with proper configuration
 API_VERSION = "2023-04"  # Add this as a constant at the top
 
-# Then use it like:
-session = shopify.Session(SHOP_URL, API_VERSION, SHOPIFY_ACCESS_TOKEN)
+
+@lru_cache(maxsize=None)
+def get_shopify_session(api_version=API_VERSION):
+    """Build the Shopify session for an API version once and reuse it"""
+    return shopify.Session(SHOP_URL, api_version, SHOPIFY_ACCESS_TOKEN)
+
+
+def activate_shopify_session(api_version=API_VERSION):
+    """Activate the cached session on the current thread and return it"""
+    session = get_shopify_session(api_version)
+    shopify.ShopifyResource.activate_session(session)
+    return session
+
 
 # Activate session and set up connection
-shopify.ShopifyResource.activate_session(session)
+session = activate_shopify_session()
 shopify.ShopifyResource.site = f"{SHOP_URL}/admin/api/{API_VERSION}"
 
 def extract_tire_data_from_product(product_data, product_obj):
@@ -276,35 +323,122 @@ def extract_tire_data_from_product(product_data, product_obj):
     
     return tire_data
 
+
+def encode_upload(file_storage):
+    """
+    Base64-encode an uploaded file in one pass, straight from the BytesIO
+    InMemoryUploadRequest keeps it in (getbuffer() is a view, not a copy)
+    """
+    with file_storage.stream.getbuffer() as data:
+        return base64.b64encode(data).decode('ascii')
+
+
+def save_product_metafield(session, product_id, key, value, mf_type):
+    """Save a single custom.* product metafield (runs on a worker thread)"""
+    # Shopify sessions are thread-local, so activate it on this thread too
+    shopify.ShopifyResource.activate_session(session)
+    try:
+        metafield = shopify.Metafield()
+        metafield.namespace = 'custom'
+        metafield.key = key
+        metafield.type = mf_type
+        metafield.owner_id = product_id
+        metafield.owner_resource = 'product'
+        
+        # Format value based on type
+        if mf_type == 'number_integer':
+            metafield.value = str(int(float(value)))
+        elif mf_type == 'number_decimal':
+            metafield.value = str(float(value))
+        elif mf_type == 'date':
+            metafield.value = value  # Already in YYYY-MM-DD format
+        else:
+            metafield.value = str(value)
+        
+        result = metafield.save()
+        if result:
+            print(f"✅ Metafield saved: {key} = {metafield.value} ({mf_type})")
+        else:
+            print(f"❌ Metafield FAILED: {key} - {metafield.errors.full_messages()}")
+    except Exception as mf_error:
+        print(f"⚠️ Failed to save metafield {key}: {mf_error}")
+
 # NOW you can use @app.route
 
 
+# Highest numeric SKU seen so far, persisted across worker restarts so
+# get_next_sku only has to look at products updated since the last scan
+SKU_CACHE_PATH = '.sku_cache.json'
+
+
+def sku_number(sku):
+    """Numeric part of a SKU: the SKU itself, or its last run of digits"""
+    try:
+        return int(sku)
+    except ValueError:
+        numbers = re.findall(r'\d+', sku)
+        return int(numbers[-1]) if numbers else None
+
+
+def load_sku_cache():
+    """Read the cached SKU high-water mark ({'max', 'updated_at'}) if any"""
+    try:
+        with open(SKU_CACHE_PATH, 'rb') as f:
+            cache = orjson.loads(f.read())
+        return cache if 'max' in cache and 'updated_at' in cache else None
+    except (OSError, ValueError):
+        return None
+
+
+def save_sku_cache(max_sku, updated_at):
+    """Atomically write the SKU high-water mark"""
+    tmp_path = f"{SKU_CACHE_PATH}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps({'max': max_sku, 'updated_at': updated_at}))
+        os.replace(tmp_path, SKU_CACHE_PATH)
+    except OSError:
+        # Don't leave a half-written temp file behind
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def remember_sku(sku):
+    """Raise the cached high-water mark after a product is created"""
+    sku_num = sku_number(sku) if sku else None
+    cache = load_sku_cache()
+    if cache and sku_num is not None and sku_num > cache['max']:
+        save_sku_cache(sku_num, cache['updated_at'])
+
+
 def get_next_sku():
     """Get the next available SKU by finding the highest numeric SKU and adding 1"""
     try:
         # Activate session with stable API version
-        API_VERSION = "2023-04"  # Use stable version
-        session = shopify.Session(SHOP_URL, API_VERSION, SHOPIFY_ACCESS_TOKEN)
-        shopify.ShopifyResource.activate_session(session)
+        activate_shopify_session()
         
-        # Get all products with their variants
-        all_skus = []
-        products = shopify.Product.find(limit=250)
+        # Start from the cached maximum and only scan products updated since
+        # then; without a cache this is a full scan of the catalog
+        cache = load_sku_cache()
+        scan_started = datetime.now(timezone.utc).isoformat()
+        params = {'limit': 250, 'fields': 'variants'}
+        highest = None
+        if cache:
+            highest = cache['max']
+            params['updated_at_min'] = cache['updated_at']
+        
+        products = shopify.Product.find(**params)
         
         while products:
             for product in products:
                 for variant in product.variants:
                     if variant.sku:
-                        # Try to extract numeric part of SKU
-                        try:
-                            sku_num = int(variant.sku)
-                            all_skus.append(sku_num)
-                        except ValueError:
-                            # SKU is not purely numeric, try to extract numbers
-                            import re
-                            numbers = re.findall(r'\d+', variant.sku)
-                            if numbers:
-                                all_skus.append(int(numbers[-1]))
+                        sku_num = sku_number(variant.sku)
+                        if sku_num is not None and (highest is None or sku_num > highest):
+                            highest = sku_num
             
             # Check for more pages
             if products.has_next_page():
@@ -312,9 +446,14 @@ def get_next_sku():
             else:
                 break
         
-        if all_skus:
-            next_sku = max(all_skus) + 1
-            print(f"✅ Highest SKU found: {max(all_skus)}, next SKU: {next_sku}")
+        if highest is not None:
+            # The scan result stands even if it can't be cached
+            try:
+                save_sku_cache(highest, scan_started)
+            except OSError as e:
+                print(f"⚠️ Could not save SKU cache: {e}")
+            next_sku = highest + 1
+            print(f"✅ Highest SKU found: {highest}, next SKU: {next_sku}")
             return str(next_sku)
         else:
             print("⚠️ No numeric SKUs found, starting at 1001")
@@ -332,8 +471,7 @@ def index():
     """Homepage with product creation form"""
     
     # ✅ ACTIVATE SESSION FIRST
-    session = shopify.Session(SHOP_URL, "unstable", SHOPIFY_ACCESS_TOKEN)
-    shopify.ShopifyResource.activate_session(session)
+    activate_shopify_session("unstable")
     
     try:
         shop = shopify.Shop.current()
@@ -413,8 +551,7 @@ def test_connection():
     
     try:
         # Create a fresh session for this request
-        test_session = shopify.Session(SHOP_URL, "unstable", SHOPIFY_ACCESS_TOKEN)
-        shopify.ShopifyResource.activate_session(test_session)
+        activate_shopify_session("unstable")
         
         print("✅ Session activated, attempting to fetch shop...")
         
@@ -476,8 +613,7 @@ def check_sku():
         return jsonify({'available': False, 'error': 'SKU is empty'})
     
     try:
-        session = shopify.Session(SHOP_URL, "2023-04", SHOPIFY_ACCESS_TOKEN)
-        shopify.ShopifyResource.activate_session(session)
+        activate_shopify_session()
         
         # Use GraphQL for efficient SKU search
         query = '''
@@ -497,8 +633,7 @@ def check_sku():
         ''' % sku_to_check.replace('"', '\\"')
         
         result = shopify.GraphQL().execute(query)
-        import json as json_module
-        data = json_module.loads(result)
+        data = orjson.loads(result)
         
         edges = data.get('data', {}).get('productVariants', {}).get('edges', [])
         
@@ -523,8 +658,7 @@ def check_sku():
 def create_product():
     """Create a new product in Shopify and optionally print label"""
     # ✅ ACTIVATE SESSION FIRST
-    session = shopify.Session(SHOP_URL, "2023-04", SHOPIFY_ACCESS_TOKEN)
-    shopify.ShopifyResource.activate_session(session)
+    session = activate_shopify_session()
     try:
         # ── SKU duplicate check (server-side safety net) ──
         sku_value = request.form.get('sku', '').strip()
@@ -543,8 +677,7 @@ def create_product():
                 }
                 ''' % sku_value.replace('"', '\\"')
                 result = shopify.GraphQL().execute(query)
-                import json as json_module
-                sku_data = json_module.loads(result)
+                sku_data = orjson.loads(result)
                 for edge in sku_data.get('data', {}).get('productVariants', {}).get('edges', []):
                     if edge['node'].get('sku', '') == sku_value:
                         product_title = edge['node']['product']['title']
@@ -608,7 +741,7 @@ def create_product():
             for image_file in request.files.getlist('images'):
                 if image_file and image_file.filename:
                     image = shopify.Image()
-                    image.attach_image(image_file.read())
+                    image.attachment = encode_upload(image_file)
                     images.append(image)
         
         if images:
@@ -619,6 +752,11 @@ def create_product():
             product_id = product.id
             print(f"✅ Product created: {product.title} (ID: {product_id})")
             
+            try:
+                remember_sku(sku_value)
+            except OSError as cache_error:
+                print(f"⚠️ Could not update SKU cache: {cache_error}")
+            
             # Add metafields for tire specifications (match Shopify metafield types)
             metafields_to_add = [
                 ('largeur', request.form.get('largeur'), 'number_integer'),
@@ -637,33 +775,11 @@ def create_product():
                 ('model', request.form.get('model'), 'single_line_text_field'),
             ]
             
-            for key, value, mf_type in metafields_to_add:
-                if value:  # Only add if value exists
-                    try:
-                        metafield = shopify.Metafield()
-                        metafield.namespace = 'custom'
-                        metafield.key = key
-                        metafield.type = mf_type
-                        metafield.owner_id = product_id
-                        metafield.owner_resource = 'product'
-                        
-                        # Format value based on type
-                        if mf_type == 'number_integer':
-                            metafield.value = str(int(float(value)))
-                        elif mf_type == 'number_decimal':
-                            metafield.value = str(float(value))
-                        elif mf_type == 'date':
-                            metafield.value = value  # Already in YYYY-MM-DD format
-                        else:
-                            metafield.value = str(value)
-                        
-                        result = metafield.save()
-                        if result:
-                            print(f"✅ Metafield saved: {key} = {metafield.value} ({mf_type})")
-                        else:
-                            print(f"❌ Metafield FAILED: {key} - {metafield.errors.full_messages()}")
-                    except Exception as mf_error:
-                        print(f"⚠️ Failed to save metafield {key}: {mf_error}")
+            # Save metafields concurrently instead of one POST after another
+            with ThreadPoolExecutor(max_workers=METAFIELD_WORKERS) as executor:
+                for key, value, mf_type in metafields_to_add:
+                    if value:  # Only add if value exists
+                        executor.submit(save_product_metafield, session, product_id, key, value, mf_type)
             
             # ============================================================
             # ADD PRODUCT TO COLLECTIONS
@@ -855,8 +971,7 @@ def test_label():
 def list_publications():
     """List all available sales channels/publications"""
     # Activate session
-    session = shopify.Session(SHOP_URL, "2023-04", SHOPIFY_ACCESS_TOKEN)
-    shopify.ShopifyResource.activate_session(session)
+    activate_shopify_session()
     
     try:
         publications = get_all_publications()
@@ -876,8 +991,7 @@ def list_publications():
 def publish_product_route(product_id):
     """Manually publish a product to all sales channels"""
     # Activate session
-    session = shopify.Session(SHOP_URL, "2023-04", SHOPIFY_ACCESS_TOKEN)
-    shopify.ShopifyResource.activate_session(session)
+    activate_shopify_session()
     
     try:
         result = publish_product_to_all_channels(product_id)
@@ -899,8 +1013,7 @@ def publish_product_route(product_id):
 def get_product_publications(product_id):
     """Check which sales channels a product is published to"""
     # Activate session
-    session = shopify.Session(SHOP_URL, "2023-04", SHOPIFY_ACCESS_TOKEN)
-    shopify.ShopifyResource.activate_session(session)
+    activate_shopify_session()
     
     try:
         product_gid = f"gid://shopify/Product/{product_id}"
@@ -927,7 +1040,7 @@ def get_product_publications(product_id):
         
         variables = {"id": product_gid}
         result = shopify.GraphQL().execute(query, variables=variables)
-        data = json.loads(result)
+        data = orjson.loads(result)
         
         if 'errors' in data:
             return jsonify({
@@ -1374,8 +1487,9 @@ def delete_label(filename):
 # Import storage module
 try:
     from storage import (
-        create_print_job_with_pdf, get_pending_jobs,
-        complete_job, get_all_jobs, get_job, get_pending_count
+        create_print_job_with_pdf, get_pending_jobs, wait_for_pending_jobs,
+        complete_job, complete_jobs, get_all_jobs, get_job, get_job_pdf, get_job_pdf_gzip,
+        get_pending_count
     )
     REMOTE_PRINTING_ENABLED = True
 except ImportError:
@@ -1385,6 +1499,10 @@ except ImportError:
 # Optional API key for print agent authentication
 PRINT_AGENT_API_KEY = os.getenv('PRINT_AGENT_API_KEY', '')
 
+# Longest a print agent may hold /api/print-jobs open waiting for a new job
+# (kept under the usual 30s proxy request timeout)
+MAX_LONG_POLL_WAIT = 25
+
 
 def verify_api_key():
     """Verify API key if configured"""
@@ -1397,12 +1515,24 @@ def verify_api_key():
 
 @app.route('/api/print-jobs', methods=['GET'])
 def list_print_jobs():
-    """Get pending print jobs with embedded PDF data (for print agent)"""
+    """
+    Get pending print jobs with embedded PDF data (for print agent)
+    
+    With ?wait=N the request is held open for up to N seconds until a job
+    is queued (long-polling), instead of returning an empty list right away.
+    With ?include_pdf=0 the PDFs are left out; fetch each one from
+    /api/print-jobs/<job_id>/pdf instead.
+    """
     if not verify_api_key():
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        pending = get_pending_jobs(include_pdf=True)
+        wait = min(request.args.get('wait', 0, type=float), MAX_LONG_POLL_WAIT)
+        if wait > 0:
+            wait_for_pending_jobs(wait)
+        
+        include_pdf = request.args.get('include_pdf', '1') != '0'
+        pending = get_pending_jobs(include_pdf=include_pdf)
         return jsonify({
             'jobs': pending,
             'count': len(pending)
@@ -1411,6 +1541,35 @@ def list_print_jobs():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/print-jobs/<job_id>/pdf', methods=['GET'])
+def download_print_job_pdf(job_id):
+    """
+    Get a pending job's PDF as binary (for print agent)
+    
+    PDFs are stored gzipped, so clients that accept gzip get the stored
+    bytes as-is with Content-Encoding: gzip (requests decodes it for them).
+    """
+    if not verify_api_key():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        if request.accept_encodings['gzip']:  # quality, 0 if refused
+            pdf_gzip = get_job_pdf_gzip(job_id)
+            if pdf_gzip is None:
+                return jsonify({'error': 'Job not found'}), 404
+            response = Response(pdf_gzip, mimetype='application/pdf')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            pdf_bytes = get_job_pdf(job_id)
+            if pdf_bytes is None:
+                return jsonify({'error': 'Job not found'}), 404
+            response = Response(pdf_bytes, mimetype='application/pdf')
+        response.vary.add('Accept-Encoding')
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/print-jobs/<job_id>/complete', methods=['POST'])
 def mark_print_job_complete(job_id):
     """Mark a print job as complete (called by print agent)"""
@@ -1437,6 +1596,28 @@ def mark_print_job_complete(job_id):
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/print-jobs/complete', methods=['POST'])
+def mark_print_jobs_complete():
+    """Mark several print jobs as downloaded in one call: {"ids": [...]} (called by print agent)"""
+    if not verify_api_key():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        data = request.get_json() or {}
+        job_ids = data.get('ids') or []
+        if not isinstance(job_ids, list) or not all(isinstance(job_id, str) for job_id in job_ids):
+            return jsonify({'error': 'ids must be a list of strings'}), 400
+        
+        completed = complete_jobs(job_ids)
+        return jsonify({
+            'success': True,
+            'completed': completed,
+            'not_found': [job_id for job_id in job_ids if job_id not in completed]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/print-jobs/all', methods=['GET'])
 def list_all_print_jobs():
     """Get all print jobs without PDF data (for admin/debugging)"""
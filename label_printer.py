@@ -2,13 +2,46 @@ from reportlab.lib.pagesizes import mm
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 from reportlab.lib.colors import HexColor, black, white
-import qrcode
+import hashlib
 import io
+import json
 import os
 import platform
+import subprocess
 from datetime import datetime
+from functools import lru_cache
+
+# segno encodes and writes the QR PNG directly, much faster than qrcode's PIL
+# factory; keep qrcode as a fallback when segno isn't installed
+try:
+    import segno
+except ImportError:
+    segno = None
+    import qrcode
+    from PIL import Image
+
+# Label colors, parsed once at import instead of for every label
+_WHITE = HexColor("#FFFFFF")
+_BLACK = HexColor("#000000")
+_GRAY = HexColor("#666666")
+_BRAND_RED = HexColor("#CF343B")
+_BW_BORDER = HexColor("#333333")
+_COLOR_BORDER = HexColor("#0099CC")
 
 class TireLabelPrinter:
+    # Label fields top to bottom: (caption, product_data key, value style);
+    # the Dimensions value is assembled from largeur/hauteur/rayon
+    FIELDS = (
+        ("Marque", 'brand', 'default'),
+        ("Modèle", 'model', 'default'),
+        ("Dimensions", None, 'dimensions'),
+        ("Réf", 'sku', 'ref'),
+        ("Indice de charge", 'indice_charge', 'default'),
+        ("Indice de vitesse", 'indice_vitesse', 'default'),
+        ("DOT", 'dot', 'default'),
+        ("Profondeur", 'profondeur', 'default'),
+    )
+    
     def __init__(self, printer_name="Brother_DCP_L2530DW_series", black_and_white=True):
         self.width = 120 * mm
         self.height = 220 * mm
@@ -17,11 +50,86 @@ class TireLabelPrinter:
         
         # Logo path - look in same directory as this script
         self.logo_path = os.path.join(os.path.dirname(__file__) or '.', 'smartpneu_logo.png')
+        # Pre-converted grayscale logo for B&W mode (smaller image in the PDF,
+        # nothing left for the printer driver to desaturate)
+        self.logo_bw_path = os.path.join(os.path.dirname(__file__) or '.', 'smartpneu_logo_bw.png')
         # Branded QR code path
         self.qr_code_path = os.path.join(os.path.dirname(__file__) or '.', 'smartpneu_qr.png')
         
+        self.refresh_assets()
+        self._precompute_layout()
+    
+    def refresh_assets(self):
+        """
+        Check for the logo and branded QR images and decode them once, so
+        labels don't stat or re-read them. Call again after replacing the
+        files in a long-running process.
+        """
+        self._logo_reader = ImageReader(self.logo_path) if os.path.isfile(self.logo_path) else None
+        # Fall back to the color logo if the grayscale copy is missing
+        self._logo_bw_reader = ImageReader(self.logo_bw_path) if os.path.isfile(self.logo_bw_path) else self._logo_reader
+        self._qr_reader = ImageReader(self.qr_code_path) if os.path.isfile(self.qr_code_path) else None
+    
+    def _precompute_layout(self):
+        """Compute the fixed label geometry (in points) once instead of per label"""
+        w, h = self.width, self.height
+        self._left = 8 * mm
+        self._center_x = w / 2
+        
+        # Header band, logo and tagline
+        self._header_y = h - 30 * mm
+        self._header_h = 30 * mm
+        self._logo_w = 100 * mm
+        self._logo_h = 20 * mm
+        self._logo_x = (w - self._logo_w) / 2
+        self._logo_y = h - 24 * mm
+        self._logo_text_y = h - 18 * mm
+        self._tagline_y = h - 28 * mm
+        
+        # Body border (x, y, width, height)
+        self._border = (2 * mm, 2 * mm, w - 4 * mm, h - 32 * mm)
+        
+        # Product fields: resolve each field's value font size and the
+        # absolute baselines of its caption and value
+        value_styles = {
+            # style: (font size, baseline drop, advance to next field)
+            'dimensions': (48, 14 * mm, 30 * mm),
+            'ref': (42, 12 * mm, 28 * mm),
+            'default': (26, 7 * mm, 18 * mm),
+        }
+        self._field_layout = []
+        y_position = h - 38 * mm
+        for caption, key, style in self.FIELDS:
+            font_size, drop, advance = value_styles[style]
+            self._field_layout.append((caption, key, font_size, y_position + 2 * mm, y_position - drop))
+            y_position -= advance
+        
+        # QR code (bottom right) and phone number (bottom left)
+        self._qr_size = 30 * mm
+        self._qr_x = w - self._qr_size - 6 * mm
+        self._qr_y = 6 * mm
+        self._phone_y = 8 * mm
+        
     def generate_qr_code(self, url):
         """Generate QR code and return as image"""
+        return ImageReader(io.BytesIO(self._encode_qr_png(url, self.black_and_white)))
+    
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _encode_qr_png(url, black_and_white):
+        """Encode a QR code as PNG bytes, cached per (url, colour mode)"""
+        # Use black for QR code (works for both color and B&W)
+        fill_color = "black" if black_and_white else "#cf343b"
+        img_buffer = io.BytesIO()
+        
+        # Both paths emit 1-bit PNGs: segno picks the smallest bit depth for a
+        # two-colour code, the PIL fallback is quantised explicitly below
+        if segno is not None:
+            qr = segno.make_qr(url, error='l')
+            qr.save(img_buffer, kind='png', scale=10, border=2,
+                    dark=fill_color, light='white')
+            return img_buffer.getvalue()
+        
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -30,16 +138,14 @@ class TireLabelPrinter:
         )
         qr.add_data(url)
         qr.make(fit=True)
-        
-        # Use black for QR code (works for both color and B&W)
-        fill_color = "black" if self.black_and_white else "#cf343b"
-        img = qr.make_image(fill_color=fill_color, back_color="white")
+        img = qr.make_image(fill_color=fill_color, back_color="white").get_image()
+        if img.mode != '1':
+            # Colour QR comes back as 24-bit RGB; it only has two colours
+            img = img.convert('P', palette=Image.ADAPTIVE, colors=2)
         
         # Convert to bytes
-        img_buffer = io.BytesIO()
-        img.save(img_buffer, format='PNG')
-        img_buffer.seek(0)
-        return ImageReader(img_buffer)
+        img.save(img_buffer, format='PNG', optimize=True, bits=1)
+        return img_buffer.getvalue()
     
     def create_label(self, product_data, output_path="label.pdf"):
         """
@@ -59,59 +165,57 @@ class TireLabelPrinter:
         - product_url: URL for QR code
         """
         
-        c = canvas.Canvas(output_path, pagesize=(self.width, self.height))
-        
+        c = self._new_canvas(output_path)
+        self.draw_label(c, product_data)
+        c.save()
+        return output_path
+    
+    def _new_canvas(self, output_path):
+        """Label-sized canvas with Flate-compressed page streams"""
+        return canvas.Canvas(output_path, pagesize=(self.width, self.height), pageCompression=1)
+    
+    def draw_label(self, c, product_data):
+        """Draw one label on the current page of canvas c (see create_label)"""
         # Color scheme based on mode
-        if self.black_and_white:
-            header_bg = HexColor("#000000")
-            accent_color = HexColor("#000000")
-            border_color = HexColor("#333333")
-        else:
-            header_bg = HexColor("#CC0000")
-            accent_color = HexColor("#CC0000")
-            border_color = HexColor("#0099CC")
+        border_color = _BW_BORDER if self.black_and_white else _COLOR_BORDER
         
         # Header - White background for logo visibility
-        c.setFillColor(HexColor("#FFFFFF"))
-        c.rect(0, self.height - 30*mm, self.width, 30*mm, fill=True, stroke=False)
+        c.setFillColor(_WHITE)
+        c.rect(0, self._header_y, self.width, self._header_h, fill=True, stroke=False)
         
         # Draw the SmartPneu logo
+        logo_reader = self._logo_bw_reader if self.black_and_white else self._logo_reader
         try:
-            if os.path.exists(self.logo_path):
-                logo_width = 100 * mm
-                logo_height = 20 * mm
-                logo_x = (self.width - logo_width) / 2
-                logo_y = self.height - 24 * mm
-                
-                c.drawImage(self.logo_path, logo_x, logo_y, 
-                           width=logo_width, height=logo_height,
+            if logo_reader is not None:
+                c.drawImage(logo_reader, self._logo_x, self._logo_y, 
+                           width=self._logo_w, height=self._logo_h,
                            preserveAspectRatio=True, mask='auto')
             else:
-                c.setFillColor(HexColor("#CF343B"))
+                c.setFillColor(_BRAND_RED)
                 c.setFont("Helvetica-Bold", 18)
-                c.drawCentredString(self.width / 2, self.height - 18*mm, "smartpneu.com")
+                c.drawCentredString(self._center_x, self._logo_text_y, "smartpneu.com")
         except Exception as e:
             print(f"⚠️ Logo error: {e}")
-            c.setFillColor(HexColor("#CF343B"))
+            c.setFillColor(_BRAND_RED)
             c.setFont("Helvetica-Bold", 18)
-            c.drawCentredString(self.width / 2, self.height - 18*mm, "smartpneu.com")
+            c.drawCentredString(self._center_x, self._logo_text_y, "smartpneu.com")
         
         # Tagline below logo
-        c.setFillColor(HexColor("#666666"))
+        c.setFillColor(_GRAY)
         c.setFont("Helvetica", 7)
-        c.drawCentredString(self.width / 2, self.height - 28*mm, "Pneus d'occasion certifiés à prix imbattables")
+        c.drawCentredString(self._center_x, self._tagline_y, "Pneus d'occasion certifiés à prix imbattables")
         
         # Body - White background
-        c.setFillColor(HexColor("#FFFFFF"))
-        c.rect(0, 0, self.width, self.height - 30*mm, fill=True, stroke=False)
+        c.setFillColor(_WHITE)
+        c.rect(0, 0, self.width, self._header_y, fill=True, stroke=False)
         
         # Border
         c.setStrokeColor(border_color)
         c.setLineWidth(2)
-        c.rect(2*mm, 2*mm, self.width - 4*mm, self.height - 32*mm, fill=False, stroke=True)
+        c.rect(*self._border, fill=False, stroke=True)
         
         # ── Product information ──
-        y_position = self.height - 38*mm
+        left = self._left
         
         # Format dimensions properly
         rayon = product_data.get('rayon', '').replace('R', '').replace('r', '')
@@ -119,50 +223,28 @@ class TireLabelPrinter:
         if dimensions == " /  R":
             dimensions = "—"
         
-        fields = [
-            ("Marque", product_data.get('brand', '—')),
-            ("Modèle", product_data.get('model', '—')),
-            ("Dimensions", dimensions),
-            ("Réf", product_data.get('sku', '—')),
-            ("Indice de charge", product_data.get('indice_charge', '—')),
-            ("Indice de vitesse", product_data.get('indice_vitesse', '—')),
-            ("DOT", product_data.get('dot', '—')),
-            ("Profondeur", product_data.get('profondeur', '—')),
-        ]
-        
         label_font_size = 10
-        big_value_font_size = 26
-        dimensions_font_size = 48
-        ref_font_size = 42
         
-        for label, value in fields:
+        for label, key, font_size, label_y, value_y in self._field_layout:
+            value = product_data.get(key, '—') if key else dimensions
+            
             # Label in italic, gray
-            c.setFillColor(HexColor("#666666"))
+            c.setFillColor(_GRAY)
             c.setFont("Helvetica-Oblique", label_font_size)
-            c.drawString(8*mm, y_position + 2*mm, label)
+            c.drawString(left, label_y, label)
             
             # Value in bold, black
-            c.setFillColor(HexColor("#000000"))
-            if label == "Dimensions":
-                c.setFont("Helvetica-Bold", dimensions_font_size)
-                c.drawString(8*mm, y_position - 14*mm, str(value) if value else "—")
-                y_position -= 30*mm
-            elif label == "Réf":
-                c.setFont("Helvetica-Bold", ref_font_size)
-                c.drawString(8*mm, y_position - 12*mm, str(value) if value else "—")
-                y_position -= 28*mm
-            else:
-                c.setFont("Helvetica-Bold", big_value_font_size)
-                c.drawString(8*mm, y_position - 7*mm, str(value) if value else "—")
-                y_position -= 18*mm
+            c.setFillColor(_BLACK)
+            c.setFont("Helvetica-Bold", font_size)
+            c.drawString(left, value_y, str(value) if value else "—")
         
         # QR Code - branded image, bottom right
-        qr_size = 30*mm
+        qr_size = self._qr_size
         try:
-            if os.path.exists(self.qr_code_path):
-                c.drawImage(self.qr_code_path, 
-                           self.width - qr_size - 6*mm,
-                           6*mm,
+            if self._qr_reader is not None:
+                c.drawImage(self._qr_reader, 
+                           self._qr_x,
+                           self._qr_y,
                            width=qr_size, 
                            height=qr_size,
                            preserveAspectRatio=True,
@@ -170,8 +252,8 @@ class TireLabelPrinter:
             else:
                 qr_image = self.generate_qr_code(product_data.get('product_url', 'https://smartpneu.com'))
                 c.drawImage(qr_image, 
-                           self.width - qr_size - 6*mm,
-                           6*mm,
+                           self._qr_x,
+                           self._qr_y,
                            width=qr_size, 
                            height=qr_size)
         except Exception as e:
@@ -179,10 +261,7 @@ class TireLabelPrinter:
         
         # Phone number at bottom left
         c.setFont("Helvetica-Bold", 14)
-        c.drawString(8*mm, 8*mm, "Tel : 09 70 70 71 36")
-        
-        c.save()
-        return output_path
+        c.drawString(left, self._phone_y, "Tel : 09 70 70 71 36")
     
     def print_label(self, pdf_path):
         """Send PDF to printer"""
@@ -207,18 +286,18 @@ class TireLabelPrinter:
             elif system == "Linux" or system == "Darwin":  # Linux or macOS
                 # Use CUPS/lp command
                 # Brother DCP-L2530DW: Custom size + labels + manual tray
-                media_options = "-o media=Custom.120x220mm,labels -o InputSlot=manual"
+                cmd = ['lp', '-d', self.printer_name,
+                       '-o', 'media=Custom.120x220mm,labels', '-o', 'InputSlot=manual']
                 if self.black_and_white:
                     # B&W printing options
-                    bw_options = "-o print-color-mode=monochrome -o ColorModel=Gray"
-                    cmd = f'lp -d {self.printer_name} {media_options} {bw_options} {pdf_path}'
-                else:
-                    # Color printing
-                    cmd = f'lp -d {self.printer_name} {media_options} {pdf_path}'
+                    cmd += ['-o', 'print-color-mode=monochrome', '-o', 'ColorModel=Gray']
+                cmd.append(pdf_path)
                 
-                print(f"🖨️  Print command: {cmd}")
-                result = os.system(cmd)
-                return result == 0
+                print(f"🖨️  Print command: {' '.join(cmd)}")
+                result = subprocess.run(cmd, capture_output=True, text=True)
+                if result.returncode != 0:
+                    print(f"⚠️  lp: {result.stderr.strip()}")
+                return result.returncode == 0
             else:
                 print(f"Unsupported OS: {system}")
                 return False
@@ -245,10 +324,21 @@ class TireLabelPrinter:
         # Create labels directory if it doesn't exist
         os.makedirs("labels", exist_ok=True)
         
-        # Generate label
-        self.create_label(product_data, pdf_path)
+        # Reprinting an unchanged label reuses the PDF from last time
         mode = "B&W" if self.black_and_white else "Color"
-        print(f"✅ Label generated ({mode}): {pdf_path}")
+        label_key = hashlib.blake2b(
+            json.dumps([mode, product_data], sort_keys=True, default=str).encode(),
+            digest_size=16
+        ).hexdigest()
+        marker_path = f"labels/.hash_{sku}"
+        if self._label_unchanged(pdf_path, marker_path, label_key):
+            print(f"♻️  Label unchanged ({mode}): {pdf_path}")
+        else:
+            # Generate label
+            self.create_label(product_data, pdf_path)
+            with open(marker_path, 'w') as f:
+                f.write(self._label_marker(pdf_path, label_key))
+            print(f"✅ Label generated ({mode}): {pdf_path}")
         
         # Print label if enabled
         if print_enabled:
@@ -259,6 +349,25 @@ class TireLabelPrinter:
                 print("⚠️  Failed to print label - PDF saved for manual printing")
         
         return pdf_path
+    
+    @staticmethod
+    def _label_marker(pdf_path, label_key):
+        """
+        Marker for pdf_path as generated from data hashing to label_key. The
+        PDF's mtime and size are included so a label rewritten by anything
+        else (e.g. regenerate-label) no longer matches.
+        """
+        stat = os.stat(pdf_path)
+        return f"{label_key}:{stat.st_mtime_ns}:{stat.st_size}"
+    
+    @classmethod
+    def _label_unchanged(cls, pdf_path, marker_path, label_key):
+        """True if pdf_path is, untouched since, the one generated from data hashing to label_key"""
+        try:
+            with open(marker_path) as f:
+                return f.read() == cls._label_marker(pdf_path, label_key)
+        except OSError:
+            return False
 
 
 # Standalone test function
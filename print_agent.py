@@ -12,26 +12,61 @@ Web interface: http://localhost:5050
 Configuration via environment variables or .env file:
     SERVER_URL - Railway app URL (e.g., https://your-app.railway.app)
     PRINTER_NAME - Local printer name (default: Brother_MFC_L3710CW_series)
-    POLL_INTERVAL - Seconds between polls (default: 5)
+    POLL_INTERVAL - Seconds between polls if the server can't long-poll (default: 5)
+    LONG_POLL_WAIT - Seconds the server may hold a poll open for new jobs (default: 25)
     PRINT_AGENT_API_KEY - API key for authentication (optional)
     LABELS_FOLDER - Where to save labels (default: ~/Documents/SmartPneu-Labels)
     LOCAL_PORT - Port for local web interface (default: 5050)
+
+Optional packages (pip install ...):
+    pycups - check the printer and submit jobs through libcups instead of
+             running lpstat/lp
+    flask-compress - gzip the web interface's responses
+    watchdog - refresh label lists on file events instead of re-scanning
+               the folders' mtimes on every request
 """
 
 import os
 import time
+import random
 import base64
+import hashlib
 import json
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import subprocess
 import threading
-import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, render_template_string, jsonify, send_file, request
+from flask import Flask, Response, jsonify, send_file, request
+from flask.json.provider import DefaultJSONProvider
 from dotenv import load_dotenv
 from label_printer import TireLabelPrinter
 
+# flask-compress gzips the (large, often reloaded) web UI responses (optional)
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+# pycups talks to CUPS directly instead of running lpstat/lp (optional)
+try:
+    import cups
+except ImportError:
+    cups = None
+
+# watchdog lets label listings be invalidated by filesystem events instead
+# of re-checking folder mtimes on every request (optional)
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
 # Load environment variables
 load_dotenv()
 
@@ -39,16 +74,100 @@ load_dotenv()
 SERVER_URL = os.getenv('SERVER_URL', 'http://localhost:5000')
 PRINTER_NAME = os.getenv('PRINTER_NAME', 'Brother_MFC_L3710CW_series')
 POLL_INTERVAL = int(os.getenv('POLL_INTERVAL', 5))
+LONG_POLL_WAIT = int(os.getenv('LONG_POLL_WAIT', 25))
 API_KEY = os.getenv('PRINT_AGENT_API_KEY', '')
 LABELS_FOLDER = os.getenv('LABELS_FOLDER', os.path.expanduser('~/Documents/SmartPneu-Labels'))
 ARCHIVE_FOLDER = os.path.join(LABELS_FOLDER, '_archive')
 LOCAL_PORT = int(os.getenv('LOCAL_PORT', 5050))
 
+# Resolved once; every path taken from a request must stay inside these
+LABELS_BASE = os.path.realpath(LABELS_FOLDER)
+ARCHIVE_BASE = os.path.realpath(ARCHIVE_FOLDER)
+
+# Print options for every label job (lp -o / CUPS job options)
+PRINT_OPTIONS = {'media': 'Custom.120x220mm,labels', 'InputSlot': 'Auto'}
+
+# Seconds a printer availability check is reused before asking CUPS again
+PRINTER_CHECK_TTL = 60
+_printer_check = [0.0, None]  # [monotonic time of last check, state]
+
+# Jobs downloaded and saved in parallel when several are pending
+JOB_WORKERS = 4
+job_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+
+# Longest pause (seconds) between polls while the server keeps failing
+MAX_POLL_BACKOFF = 60
+
+# Seconds print_pdf waits for lp (so errors reach the UI) before returning
+LP_SUBMIT_TIMEOUT = 2
+
+# Date folders new labels have already been saved into (see new_label_path)
+_ensured_folders = set()
+
+# Label listings by folder: {folder: (signature, (labels_by_date, total))}.
+# The signature is folder_signature(), or labels_generation while watchdog
+# watches LABELS_FOLDER. Watchdog events can arrive late or coalesced, so the
+# agent's own changes bump labels_generation directly (see labels_changed).
+_labels_cache = {}
+labels_observer = None
+labels_generation = 0
+
 # Track pending count for UI
 pending_on_server = 0
 
-# Flask app for local web interface
-app = Flask(__name__)
+# Jobs saved but not yet acknowledged by the server: {job_id: pdf_path}
+_saved_jobs = {}
+
+# Failed PDF downloads per job id; once a job has failed MAX_DOWNLOAD_ATTEMPTS
+# times it is reported failed to the server instead of retried every poll
+MAX_DOWNLOAD_ATTEMPTS = 5
+_download_failures = {}
+
+# Seconds between checks for label changes pushed to the UI over /events,
+# and between keep-alive comments on an idle stream
+EVENTS_CHECK_INTERVAL = 1
+EVENTS_KEEPALIVE = 15
+
+# Cleared once the server turns out not to have the bulk-complete endpoint
+bulk_ack_supported = True
+
+# One HTTP session for all server calls, so the connection (and TLS session)
+# to the server is kept alive between polls instead of reopened every time
+SESSION = requests.Session()
+# Retry transient 5xx answers (honouring Retry-After) before giving up.
+# Read timeouts aren't retried here: for a long-poll they just mean
+# "no jobs yet" and poll_loop asks again straight away.
+# Keep a kept-alive connection for the poll plus one per job worker, so
+# concurrent downloads and acks never open (and then drop) extra ones.
+SESSION.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=JOB_WORKERS + 1, max_retries=Retry(
+    total=5, read=False, backoff_factor=1.0, status_forcelist=[500, 502, 503, 504],
+    respect_retry_after_header=True, raise_on_status=False)))
+SESSION.mount('https://', SESSION.get_adapter('http://'))
+if API_KEY:
+    SESSION.headers['X-API-Key'] = API_KEY
+
+# Label renderer for regenerated labels, built once so its images and
+# layout are reused across requests
+label_printer = TireLabelPrinter(black_and_white=True)
+
+# Flask app for local web interface; its CSS/JS live in agent_static/
+app = Flask(__name__, static_folder='agent_static', static_url_path='/static')
+if Compress is not None:
+    Compress(app)
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """jsonify/request.json through orjson (the /api/labels listing can get big)"""
+    
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_SORT_KEYS if self.sort_keys else 0
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+app.json = ORJSONProvider(app)
 
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -56,104 +175,10 @@ HTML_TEMPLATE = """
 <head>
     <title>SmartPneu Labels</title>
     <meta name="viewport" content="width=device-width, initial-scale=1">
-    <!-- Auto-refresh handled by JS (pauses when edit modal is open) -->
-    <style>
-        * { box-sizing: border-box; }
-        body { 
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            margin: 0; padding: 20px; background: #f5f5f5;
-        }
-        h1 { color: #333; margin-bottom: 20px; }
-        .status { 
-            background: #e8f5e9; padding: 15px 20px; border-radius: 8px; 
-            margin-bottom: 20px; display: flex; align-items: center; gap: 15px;
-            flex-wrap: wrap;
-        }
-        .status.warning { background: #fff3e0; }
-        .status-item { display: flex; align-items: center; gap: 8px; }
-        .badge { 
-            background: #1976d2; color: white; padding: 2px 8px; 
-            border-radius: 12px; font-size: 13px; font-weight: 600;
-        }
-        .badge.pending { background: #ff9800; }
-        .badge.success { background: #43a047; }
-        .badge.archive { background: #9e9e9e; }
-        .tabs {
-            display: flex; gap: 10px; margin-bottom: 20px;
-        }
-        .tab {
-            padding: 10px 20px; border: none; border-radius: 8px;
-            cursor: pointer; font-size: 14px; font-weight: 500;
-            background: #e0e0e0; color: #666;
-        }
-        .tab.active { background: #1976d2; color: white; }
-        .tab:hover:not(.active) { background: #d0d0d0; }
-        .date-group { 
-            background: white; border-radius: 12px; padding: 20px; 
-            margin-bottom: 20px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }
-        .date-header { 
-            font-size: 18px; font-weight: 600; color: #1976d2; 
-            margin-bottom: 15px; padding-bottom: 10px; border-bottom: 2px solid #e3f2fd;
-            display: flex; justify-content: space-between; align-items: center;
-        }
-        .date-header.archive { color: #757575; border-bottom-color: #e0e0e0; }
-        .labels-grid { 
-            display: grid; grid-template-columns: repeat(auto-fill, minmax(300px, 1fr)); 
-            gap: 15px;
-        }
-        .label-card { 
-            border: 1px solid #e0e0e0; border-radius: 8px; padding: 15px;
-            background: #fafafa; transition: all 0.2s;
-        }
-        .label-card:hover { border-color: #1976d2; background: #fff; }
-        .label-card.printed { border-left: 4px solid #43a047; }
-        .label-card.archived { opacity: 0.7; border-left: 4px solid #9e9e9e; }
-        .label-name { font-weight: 500; margin-bottom: 8px; word-break: break-all; }
-        .label-meta { color: #666; font-size: 13px; margin-bottom: 12px; }
-        .btn-group { display: flex; gap: 8px; flex-wrap: wrap; }
-        .btn { 
-            flex: 1; padding: 10px 12px; border: none; border-radius: 6px; 
-            cursor: pointer; font-size: 14px; font-weight: 500; transition: all 0.2s;
-            min-width: 70px;
-        }
-        .btn-view { background: #e3f2fd; color: #1976d2; }
-        .btn-view:hover { background: #bbdefb; }
-        .btn-print { background: #1976d2; color: white; }
-        .btn-print:hover { background: #1565c0; }
-        .btn-print:disabled { background: #ccc; cursor: not-allowed; }
-        .btn-archive { background: #f5f5f5; color: #757575; border: 1px solid #e0e0e0; }
-        .btn-archive:hover { background: #eeeeee; }
-        .btn-edit { background: #ff9800; color: white; }
-        .btn-edit:hover { background: #f57c00; }
-        .btn-restore { background: #fff3e0; color: #f57c00; }
-        .btn-restore:hover { background: #ffe0b2; }
-        .btn-print-all { background: #43a047; color: white; padding: 8px 16px; }
-        .btn-print-all:hover { background: #388e3c; }
-        .btn-archive-all { background: #9e9e9e; color: white; padding: 8px 16px; margin-left: 8px; }
-        .btn-archive-all:hover { background: #757575; }
-        .empty { text-align: center; padding: 40px; color: #666; }
-        .toast {
-            position: fixed; bottom: 20px; right: 20px; padding: 15px 25px;
-            background: #333; color: white; border-radius: 8px;
-            display: none; animation: fadeIn 0.3s; z-index: 1000;
-        }
-        .toast.success { background: #43a047; }
-        .toast.error { background: #e53935; }
-        .toast.warning { background: #ff9800; }
-        @keyframes fadeIn { from { opacity: 0; transform: translateY(20px); } }
-        .header { display: flex; align-items: center; margin-bottom: 20px; flex-wrap: wrap; gap: 10px; }
-        .header h1 { margin: 0; flex: 1; }
-        .refresh-btn {
-            background: #fff; border: 1px solid #ddd; padding: 8px 16px;
-            border-radius: 6px; cursor: pointer;
-        }
-        .refresh-btn:hover { background: #f5f5f5; }
-        .content-section { display: none; }
-        .content-section.active { display: block; }
-    </style>
+    <!-- Live refresh from /events handled by JS (pauses when edit modal is open) -->
+    <link rel="stylesheet" href="/static/agent.css?v={{ asset_version }}">
 </head>
-<body>
+<body data-labels-version="{{ labels_version }}">
     <div class="header">
         <h1>🏷️ SmartPneu Labels</h1>
         <button class="refresh-btn" onclick="location.reload()">🔄 Refresh</button>
@@ -263,216 +288,7 @@ HTML_TEMPLATE = """
     
     <div class="toast" id="toast"></div>
     
-    <script>
-        function showTab(tab) {
-            // Update tabs
-            document.querySelectorAll('.tab').forEach(t => t.classList.remove('active'));
-            event.target.classList.add('active');
-            
-            // Update sections
-            document.querySelectorAll('.content-section').forEach(s => s.classList.remove('active'));
-            document.getElementById(tab + '-section').classList.add('active');
-        }
-        
-        function showToast(message, type) {
-            const toast = document.getElementById('toast');
-            toast.textContent = message;
-            toast.className = 'toast ' + type;
-            toast.style.display = 'block';
-            setTimeout(() => { toast.style.display = 'none'; }, 3000);
-        }
-        
-        async function printLabel(path, btn) {
-            if (btn) {
-                btn.disabled = true;
-                btn.textContent = '⏳';
-            }
-            try {
-                const response = await fetch('/print/' + path, { method: 'POST' });
-                const data = await response.json();
-                if (data.success) {
-                    showToast('✅ Sent to printer!', 'success');
-                    if (btn) btn.closest('.label-card').classList.add('printed');
-                } else {
-                    showToast('❌ ' + data.error, 'error');
-                }
-            } catch (e) {
-                showToast('❌ Error: ' + e.message, 'error');
-            }
-            if (btn) {
-                btn.disabled = false;
-                btn.textContent = '🖨️ Print';
-            }
-        }
-        
-        async function archiveLabel(path) {
-            try {
-                const response = await fetch('/archive/' + path, { method: 'POST' });
-                const data = await response.json();
-                if (data.success) {
-                    showToast('📦 Archived!', 'success');
-                    setTimeout(() => location.reload(), 500);
-                } else {
-                    showToast('❌ ' + data.error, 'error');
-                }
-            } catch (e) {
-                showToast('❌ Error: ' + e.message, 'error');
-            }
-        }
-        
-        async function restoreLabel(path) {
-            try {
-                const response = await fetch('/restore/' + path, { method: 'POST' });
-                const data = await response.json();
-                if (data.success) {
-                    showToast('↩️ Restored!', 'success');
-                    setTimeout(() => location.reload(), 500);
-                } else {
-                    showToast('❌ ' + data.error, 'error');
-                }
-            } catch (e) {
-                showToast('❌ Error: ' + e.message, 'error');
-            }
-        }
-        
-        async function printAllInGroup(date) {
-            const cards = document.querySelectorAll(`.label-card[data-date="${date}"]`);
-            showToast(`🖨️ Printing ${cards.length} labels...`, 'success');
-            
-            for (const card of cards) {
-                const path = card.dataset.path;
-                const btn = card.querySelector('.btn-print');
-                await printLabel(path, btn);
-                await new Promise(r => setTimeout(r, 500));
-            }
-        }
-        
-        async function archiveAllInGroup(date) {
-            const cards = document.querySelectorAll(`.label-card[data-date="${date}"]`);
-            if (!confirm(`Archive all ${cards.length} labels from ${date}?`)) return;
-            
-            showToast(`📦 Archiving ${cards.length} labels...`, 'success');
-            
-            for (const card of cards) {
-                const path = card.dataset.path;
-                try {
-                    await fetch('/archive/' + path, { method: 'POST' });
-                } catch (e) {}
-            }
-            
-            setTimeout(() => location.reload(), 500);
-        }
-        
-        // Edit label functions
-        async function editLabel(path, sku) {
-            try {
-                const response = await fetch('/api/label-data/' + path);
-                const data = await response.json();
-                
-                if (data.success && data.data) {
-                    // Check if we have full data or just SKU
-                    if (data.data.brand || data.data.largeur) {
-                        populateEditForm(path, data.data);
-                    } else {
-                        // Only have SKU - show message
-                        populateEditForm(path, data.data);
-                        showToast('⚠️ No saved data for this label - fill in details to save', 'warning');
-                    }
-                } else {
-                    populateEditForm(path, { sku: sku });
-                    showToast('⚠️ No saved data for this label - fill in details to save', 'warning');
-                }
-            } catch (e) {
-                populateEditForm(path, { sku: sku });
-            }
-            
-            document.getElementById('editModal').style.display = 'flex';
-        }
-        
-        function populateEditForm(path, data) {
-            document.getElementById('editPath').value = path;
-            document.getElementById('editBrand').value = data.brand || '';
-            document.getElementById('editModel').value = data.model || '';
-            document.getElementById('editLargeur').value = data.largeur || '';
-            document.getElementById('editHauteur').value = data.hauteur || '';
-            document.getElementById('editRayon').value = (data.rayon || '').toString().replace('R', '').replace('r', '');
-            document.getElementById('editSku').value = data.sku || '';
-            document.getElementById('editIndiceCharge').value = data.indice_charge || '';
-            document.getElementById('editIndiceVitesse').value = data.indice_vitesse || '';
-            document.getElementById('editDot').value = data.dot || '';
-            document.getElementById('editProfondeur').value = data.profondeur || '';
-        }
-        
-        function closeEditModal() {
-            document.getElementById('editModal').style.display = 'none';
-        }
-        
-        async function saveLabel(event) {
-            event.preventDefault();
-            
-            const btn = document.getElementById('saveBtn');
-            btn.disabled = true;
-            btn.textContent = '⏳ Saving...';
-            
-            const formData = {
-                path: document.getElementById('editPath').value,
-                brand: document.getElementById('editBrand').value,
-                model: document.getElementById('editModel').value,
-                largeur: document.getElementById('editLargeur').value,
-                hauteur: document.getElementById('editHauteur').value,
-                rayon: document.getElementById('editRayon').value,
-                sku: document.getElementById('editSku').value,
-                indice_charge: document.getElementById('editIndiceCharge').value,
-                indice_vitesse: document.getElementById('editIndiceVitesse').value,
-                dot: document.getElementById('editDot').value,
-                profondeur: document.getElementById('editProfondeur').value
-            };
-            
-            try {
-                const response = await fetch('/api/regenerate-label', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify(formData)
-                });
-                
-                const data = await response.json();
-                
-                if (data.success) {
-                    closeEditModal();
-                    showToast('✅ Label regenerated!', 'success');
-                    window.open('/view/' + data.path, '_blank');
-                    setTimeout(() => location.reload(), 500);
-                } else {
-                    showToast('❌ ' + data.error, 'error');
-                }
-            } catch (e) {
-                showToast('❌ Error: ' + e.message, 'error');
-            }
-            
-            btn.disabled = false;
-            btn.textContent = '💾 Save & Regenerate';
-        }
-        
-        // Close modal on backdrop click (attached after DOM load)
-        document.addEventListener('DOMContentLoaded', function() {
-            document.getElementById('editModal').addEventListener('click', function(e) {
-                if (e.target === this) closeEditModal();
-            });
-        });
-        
-        // Close on Escape
-        document.addEventListener('keydown', function(e) {
-            if (e.key === 'Escape') closeEditModal();
-        });
-        
-        // Smart auto-refresh: pauses when edit modal is open
-        setInterval(function() {
-            const modal = document.getElementById('editModal');
-            if (!modal || modal.style.display === 'none' || modal.style.display === '') {
-                location.reload();
-            }
-        }, 10000);
-    </script>
+    <script src="/static/agent.js?v={{ asset_version }}"></script>
     
     <!-- Edit Modal -->
     <div id="editModal" style="display:none; position:fixed; top:0; left:0; right:0; bottom:0; background:rgba(0,0,0,0.5); align-items:center; justify-content:center; z-index:1000;">
@@ -549,6 +365,25 @@ HTML_TEMPLATE = """
 """
 
 
+def minify_html(html):
+    """Drop indentation and blank lines (line breaks are kept, so inline JS still parses)"""
+    return '\n'.join(line.strip() for line in html.splitlines() if line.strip())
+
+
+def asset_version():
+    """Hash of the UI's static files, used as ?v= so browsers can cache them for good"""
+    digest = hashlib.blake2b(digest_size=6)
+    for name in ('agent.css', 'agent.js'):
+        with open(os.path.join(app.static_folder, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+# Minified and compiled once; render_template_string would re-parse it on
+# every request
+INDEX_TEMPLATE = app.jinja_env.from_string(minify_html(HTML_TEMPLATE), globals={'asset_version': asset_version()})
+
+
 def ensure_folders():
     """Create labels and archive folders if they don't exist"""
     Path(LABELS_FOLDER).mkdir(parents=True, exist_ok=True)
@@ -556,26 +391,87 @@ def ensure_folders():
 
 
 def get_labels_from_folder(base_folder):
-    """Get all labels organized by date from a folder"""
-    labels_by_date = {}
-    total = 0
+    """Get all labels organized by date from a folder (cached until it changes)"""
+    try:
+        signature = labels_generation if labels_observer else folder_signature(base_folder)
+        
+        cached = _labels_cache.get(base_folder)
+        if cached and cached[0] == signature:
+            return cached[1]
+        
+        result = scan_labels_folder(base_folder)
+    except FileNotFoundError:
+        return {}, 0
+    
+    _labels_cache[base_folder] = (signature, result)
+    return result
+
+
+class LabelsChangedHandler(FileSystemEventHandler):
+    """Invalidates cached label listings when a file is added, moved or removed"""
     
-    if not os.path.exists(base_folder):
-        return labels_by_date, total
+    def on_any_event(self, event):
+        if event.event_type in ('created', 'deleted', 'moved'):
+            labels_changed()
+
+
+def labels_changed():
+    """Invalidate cached label listings (and change the /events version)"""
+    global labels_generation
+    labels_generation += 1
+
+
+def watch_labels_folder():
+    """Start watching LABELS_FOLDER (archive included) if watchdog is installed"""
+    global labels_observer
+    if Observer is None:
+        return
     
-    # Get all date folders, sorted newest first
-    date_folders = sorted(
-        [d for d in os.listdir(base_folder) 
-         if os.path.isdir(os.path.join(base_folder, d)) and not d.startswith('_')],
-        reverse=True
-    )
+    try:
+        observer = Observer()
+        observer.schedule(LabelsChangedHandler(), LABELS_FOLDER, recursive=True)
+        observer.daemon = True
+        observer.start()
+        labels_observer = observer
+        print("👀 Watching labels folder for changes")
+    except Exception as e:
+        print(f"⚠️  Could not watch labels folder, checking it on each request: {e}")
+
+
+def folder_signature(base_folder):
+    """
+    mtimes of base_folder and each of its date folders. Adding, moving or
+    deleting a label changes its folder's mtime, so an unchanged signature
+    means the listing is still valid.
+    """
+    with os.scandir(base_folder) as entries:
+        folders = sorted(
+            (entry.name, entry.stat().st_mtime_ns) for entry in entries
+            if entry.is_dir() and not entry.name.startswith('_')
+        )
+    return os.stat(base_folder).st_mtime_ns, tuple(folders)
+
+
+def scan_labels_folder(base_folder):
+    """List the labels in a folder, grouped by date folder"""
+    labels_by_date = {}
+    total = 0
     
-    for date_folder in date_folders:
-        folder_path = os.path.join(base_folder, date_folder)
-        pdfs = sorted(
-            [f for f in os.listdir(folder_path) if f.endswith('.pdf')],
+    # Get all date folders, sorted newest first (scandir entries know their
+    # type, so no extra stat per entry)
+    with os.scandir(base_folder) as entries:
+        date_folders = sorted(
+            [(entry.name, entry.path) for entry in entries
+             if entry.is_dir() and not entry.name.startswith('_')],
             reverse=True
         )
+    
+    for date_folder, folder_path in date_folders:
+        with os.scandir(folder_path) as entries:
+            pdfs = sorted(
+                [entry.name for entry in entries if entry.name.endswith('.pdf')],
+                reverse=True
+            )
         
         if pdfs:
             labels_by_date[date_folder] = []
@@ -611,91 +507,203 @@ def get_archived_labels():
     return get_labels_from_folder(ARCHIVE_FOLDER)
 
 
-def print_pdf(pdf_path):
-    """Send PDF to Brother printer"""
-    cmd = [
-        'lp',
-        '-d', PRINTER_NAME,
-        '-o', 'media=Custom.120x220mm,labels',
-        '-o', 'InputSlot=Auto',
-        pdf_path
-    ]
+def print_pdf(*pdf_paths):
+    """Send one or more PDFs to Brother printer (a single lp call for all)"""
+    # A paused printer still queues jobs, but an unknown one never will
+    if printer_state() is None:
+        return False, f"Printer '{PRINTER_NAME}' not found"
+    
+    if cups is not None:
+        try:
+            cups.Connection().printFiles(PRINTER_NAME, list(pdf_paths), 'SmartPneu labels', PRINT_OPTIONS)
+            return True, 'Submitted to printer'
+        except Exception as e:
+            return False, str(e)
+    
+    cmd = ['lp', '-d', PRINTER_NAME]
+    for option, value in PRINT_OPTIONS.items():
+        cmd += ['-o', f'{option}={value}']
+    cmd += pdf_paths
     
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            return True, result.stdout
-        else:
-            return False, result.stderr
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
     except Exception as e:
         return False, str(e)
+    
+    try:
+        stdout, stderr = proc.communicate(timeout=LP_SUBMIT_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        # lp is still handing the file to CUPS - don't hold the request for it
+        threading.Thread(target=reap_lp, args=(proc, ', '.join(pdf_paths)), daemon=True).start()
+        return True, 'Submitted to printer'
+    
+    if proc.returncode == 0:
+        return True, stdout
+    return False, stderr
+
+
+def reap_lp(proc, pdf_path):
+    """Wait for an lp process left running by print_pdf and report failures"""
+    _, stderr = proc.communicate()
+    if proc.returncode != 0:
+        print(f"⚠️  Print failed for {pdf_path}: {stderr.strip()}")
 
 
 # Flask routes
 @app.route('/')
 def index():
+    # Taken first, so a change during the listing still triggers a reload
+    version = labels_version()
     labels_by_date, total = get_all_labels()
     archived_by_date, total_archived = get_archived_labels()
-    return render_template_string(
-        HTML_TEMPLATE,
+    html = INDEX_TEMPLATE.render(
         labels_by_date=labels_by_date,
         total_labels=total,
         archived_by_date=archived_by_date,
         total_archived=total_archived,
         printer=PRINTER_NAME,
-        pending_on_server=pending_on_server
+        pending_on_server=pending_on_server,
+        labels_version=version
     )
+    # The label list changes all the time - never serve it from a cache
+    return html, {'Cache-Control': 'no-store'}
+
+
+@app.after_request
+def cache_static_files(response):
+    """Static files are versioned by content (?v=), so let browsers keep them"""
+    if request.path.startswith('/static/') and response.status_code == 200:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+@app.route('/events')
+def label_events():
+    """
+    Server-sent events for the web UI: the current labels_version() on
+    connect and again every time it changes
+    """
+    def stream():
+        last_version = None
+        idle = 0
+        while True:
+            version = labels_version()
+            if version != last_version:
+                last_version = version
+                idle = 0
+                yield f"data: {version}\n\n"
+            elif idle >= EVENTS_KEEPALIVE:
+                # Comment line: keeps proxies happy and lets us notice a
+                # closed tab (the write fails and the stream is dropped)
+                idle = 0
+                yield ": keep-alive\n\n"
+            time.sleep(EVENTS_CHECK_INTERVAL)
+            idle += EVENTS_CHECK_INTERVAL
+    
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-store'})
+
+
+def labels_version():
+    """
+    Short token that changes whenever a label is added, moved or removed,
+    or the number of labels waiting on the server changes
+    """
+    if labels_observer:
+        state = (labels_generation, pending_on_server)
+    else:
+        state = (safe_folder_signature(LABELS_FOLDER), safe_folder_signature(ARCHIVE_FOLDER), pending_on_server)
+    return format(hash(state) & 0xffffffff, 'x')
+
+
+def safe_folder_signature(base_folder):
+    """folder_signature, or None while the folder doesn't exist"""
+    try:
+        return folder_signature(base_folder)
+    except FileNotFoundError:
+        return None
 
 
 @app.route('/view/<path:filepath>')
 def view_label(filepath):
-    full_path = os.path.join(LABELS_FOLDER, filepath)
-    if os.path.exists(full_path):
-        return send_file(full_path, mimetype='application/pdf')
-    return "Not found", 404
+    return send_label_pdf(LABELS_BASE, filepath)
 
 
 @app.route('/view-archive/<path:filepath>')
 def view_archived_label(filepath):
-    full_path = os.path.join(ARCHIVE_FOLDER, filepath)
-    if os.path.exists(full_path):
-        return send_file(full_path, mimetype='application/pdf')
-    return "Not found", 404
+    return send_label_pdf(ARCHIVE_BASE, filepath)
+
+
+def send_label_pdf(base, filepath):
+    """
+    Send a label PDF with Last-Modified and ETag, so a browser reopening it
+    gets a 304 instead of the whole file again
+    """
+    full_path = resolve_label_path(base, filepath)
+    if not full_path:
+        return "Not found", 404
+    try:
+        return send_file(full_path, mimetype='application/pdf',
+                         conditional=True, etag=True, max_age=0)
+    except FileNotFoundError:
+        return "Not found", 404
+
+
+def resolve_label_path(base, filepath):
+    """
+    Absolute path of filepath under base (LABELS_BASE or ARCHIVE_BASE), or
+    None if it points outside it (e.g. '../' in the URL)
+    """
+    full_path = os.path.realpath(os.path.join(base, filepath))
+    if not full_path.startswith(base + os.sep):
+        return None
+    return full_path
 
 
 @app.route('/print/<path:filepath>', methods=['POST'])
 def reprint_label(filepath):
-    full_path = os.path.join(LABELS_FOLDER, filepath)
-    if not os.path.exists(full_path):
+    full_path = resolve_label_path(LABELS_BASE, filepath)
+    if not full_path:
         return jsonify({'success': False, 'error': 'File not found'})
     
+    # No separate existence check: lp/CUPS reports a missing file itself
     success, message = print_pdf(full_path)
     return jsonify({'success': success, 'error': message if not success else None})
 
 
+@app.route('/print-batch', methods=['POST'])
+def reprint_labels():
+    """Print several labels with one lp call: {"paths": [...]}"""
+    paths = (request.get_json(silent=True) or {}).get('paths') or []
+    if not paths:
+        return jsonify({'success': False, 'error': 'No labels to print'})
+    
+    full_paths = [resolve_label_path(LABELS_BASE, filepath) for filepath in paths]
+    missing = [filepath for filepath, full_path in zip(paths, full_paths) if not full_path]
+    if missing:
+        return jsonify({'success': False, 'error': f"File not found: {', '.join(missing)}"})
+    
+    # No separate existence check: lp/CUPS reports a missing file itself
+    success, message = print_pdf(*full_paths)
+    return jsonify({'success': success, 'error': message if not success else None})
+
+
 @app.route('/archive/<path:filepath>', methods=['POST'])
 def archive_label(filepath):
     """Move a label to archive"""
-    src_path = os.path.join(LABELS_FOLDER, filepath)
-    if not os.path.exists(src_path):
+    src_path = resolve_label_path(LABELS_BASE, filepath)
+    if not src_path:
         return jsonify({'success': False, 'error': 'File not found'})
+    filepath = os.path.relpath(src_path, LABELS_BASE)
     
     try:
-        # Create archive date folder if needed
-        date_folder = os.path.dirname(filepath)
-        archive_date_folder = os.path.join(ARCHIVE_FOLDER, date_folder)
-        Path(archive_date_folder).mkdir(parents=True, exist_ok=True)
-        
-        # Move file
-        dst_path = os.path.join(ARCHIVE_FOLDER, filepath)
-        shutil.move(src_path, dst_path)
+        move_label(src_path, os.path.join(ARCHIVE_BASE, filepath))
         
         # Clean up empty source folder
-        src_folder = os.path.dirname(src_path)
-        if os.path.isdir(src_folder) and not os.listdir(src_folder):
-            os.rmdir(src_folder)
+        remove_if_empty(os.path.dirname(src_path))
         
         return jsonify({'success': True})
+    except FileNotFoundError:
+        return jsonify({'success': False, 'error': 'File not found'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
@@ -703,30 +711,56 @@ def archive_label(filepath):
 @app.route('/restore/<path:filepath>', methods=['POST'])
 def restore_label(filepath):
     """Restore a label from archive"""
-    src_path = os.path.join(ARCHIVE_FOLDER, filepath)
-    if not os.path.exists(src_path):
+    src_path = resolve_label_path(ARCHIVE_BASE, filepath)
+    if not src_path:
         return jsonify({'success': False, 'error': 'File not found'})
+    filepath = os.path.relpath(src_path, ARCHIVE_BASE)
     
     try:
-        # Create labels date folder if needed
-        date_folder = os.path.dirname(filepath)
-        labels_date_folder = os.path.join(LABELS_FOLDER, date_folder)
-        Path(labels_date_folder).mkdir(parents=True, exist_ok=True)
-        
-        # Move file
-        dst_path = os.path.join(LABELS_FOLDER, filepath)
-        shutil.move(src_path, dst_path)
+        move_label(src_path, os.path.join(LABELS_BASE, filepath))
         
         # Clean up empty archive folder
-        src_folder = os.path.dirname(src_path)
-        if os.path.isdir(src_folder) and not os.listdir(src_folder):
-            os.rmdir(src_folder)
+        remove_if_empty(os.path.dirname(src_path))
         
         return jsonify({'success': True})
+    except FileNotFoundError:
+        return jsonify({'success': False, 'error': 'File not found'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
 
+def move_label(src_path, dst_path):
+    """
+    Move a label between the labels and archive folders (same filesystem,
+    so a plain rename). The destination date folder is only created when
+    the rename shows it's missing; FileNotFoundError means the label is gone.
+    """
+    try:
+        os.replace(src_path, dst_path)
+    except FileNotFoundError:
+        dst_folder = os.path.dirname(dst_path)
+        if os.path.isdir(dst_folder):
+            raise
+        Path(dst_folder).mkdir(parents=True, exist_ok=True)
+        os.replace(src_path, dst_path)
+    labels_changed()
+
+
+def remove_if_empty(folder):
+    """Remove a date folder once its last label has been moved out"""
+    # Best effort: the folder may already be gone (a concurrent move emptied
+    # it first) or have gained a file since the scan; the move succeeded anyway
+    try:
+        with os.scandir(folder) as entries:
+            empty = next(entries, None) is None
+        if empty:
+            os.rmdir(folder)
+            _ensured_folders.discard(folder)
+            labels_changed()
+    except OSError:
+        pass
+
+
 @app.route('/api/labels')
 def api_labels():
     labels_by_date, total = get_all_labels()
@@ -755,7 +789,9 @@ def get_label_data(filepath):
     """Get stored label data for editing"""
     try:
         # Try to load JSON data file
-        pdf_path = os.path.join(LABELS_FOLDER, filepath)
+        pdf_path = resolve_label_path(LABELS_BASE, filepath)
+        if not pdf_path:
+            return jsonify({'success': False, 'error': 'File not found'}), 404
         json_path = pdf_path.replace('.pdf', '.json')
         
         if os.path.exists(json_path):
@@ -795,23 +831,27 @@ def regenerate_label():
         }
         
         # Get original folder structure
-        original_full_path = os.path.join(LABELS_FOLDER, original_path)
-        date_folder = os.path.dirname(original_path)
-        folder_path = os.path.join(LABELS_FOLDER, date_folder) if date_folder else LABELS_FOLDER
+        original_full_path = resolve_label_path(LABELS_BASE, original_path)
+        if not original_full_path:
+            return jsonify({'success': False, 'error': 'Invalid label path'}), 400
+        date_folder = os.path.dirname(os.path.relpath(original_full_path, LABELS_BASE))
+        folder_path = os.path.join(LABELS_BASE, date_folder) if date_folder else LABELS_BASE
         
         # Create new filename with timestamp and SKU
         timestamp = datetime.now().strftime("%H%M%S")
         new_sku = label_data['sku']
         new_filename = f"{timestamp}_{new_sku}.pdf"
         new_path = os.path.join(date_folder, new_filename) if date_folder else new_filename
-        output_path = os.path.join(folder_path, new_filename)
+        # The SKU comes from the form, so it mustn't be able to leave the folder
+        output_path = resolve_label_path(LABELS_BASE, new_path)
+        if not output_path or os.path.dirname(output_path) != os.path.realpath(folder_path):
+            return jsonify({'success': False, 'error': 'Invalid SKU'}), 400
         
         # Ensure folder exists
         Path(folder_path).mkdir(parents=True, exist_ok=True)
         
         # Generate the new label
-        printer = TireLabelPrinter(black_and_white=True)
-        printer.create_label(label_data, output_path)
+        label_printer.create_label(label_data, output_path)
         
         # Save label data as JSON
         json_path = output_path.replace('.pdf', '.json')
@@ -825,6 +865,7 @@ def regenerate_label():
             if os.path.exists(old_json):
                 os.remove(old_json)
         
+        labels_changed()
         print(f"✅ Label regenerated: {new_path}")
         
         return jsonify({
@@ -840,17 +881,15 @@ def regenerate_label():
 
 # Print agent functions
 def get_pending_jobs():
-    """Fetch pending print jobs from server"""
+    """Fetch pending print jobs from server, or None if the request failed"""
     global pending_on_server
     try:
-        headers = {}
-        if API_KEY:
-            headers['X-API-Key'] = API_KEY
-        
-        response = requests.get(
+        # Long-poll: the server answers as soon as a job is queued. Fail
+        # fast on connect, but give the server the whole wait to answer.
+        response = SESSION.get(
             f"{SERVER_URL.rstrip('/')}/api/print-jobs",
-            headers=headers,
-            timeout=30
+            params={'wait': LONG_POLL_WAIT, 'include_pdf': 0},
+            timeout=(10, LONG_POLL_WAIT + 10)
         )
         
         if response.status_code == 200:
@@ -859,32 +898,77 @@ def get_pending_jobs():
             return jobs
         elif response.status_code == 401:
             print("❌ Unauthorized - check your API key")
-            return []
+            return None
         else:
             print(f"⚠️  Error fetching jobs: {response.status_code}")
-            return []
+            return None
+    except requests.exceptions.ReadTimeout:
+        # Held open past the wait (e.g. by a proxy) - nothing new, poll again
+        return []
     except requests.exceptions.RequestException as e:
         print(f"⚠️  Connection error: {e}")
-        return []
+        return None
+
+
+def write_bytes(fd, data):
+    """Write bytes straight to a file descriptor, without a buffered file object, then close it"""
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def new_label_path(sku, attempt=0):
+    """
+    Path for a newly downloaded label: LABELS_FOLDER/<date>/<HHMMSS>_<sku>.pdf,
+    or <HHMMSS>_<sku>_<attempt>.pdf when retrying after a name clash
+    """
+    # One clock read, so date and time always agree (even around midnight)
+    now = datetime.now()
+    
+    # Create dated subfolder (once - later labels that day skip the mkdir)
+    folder_path = os.path.join(LABELS_BASE, now.strftime("%Y-%m-%d"))
+    if folder_path not in _ensured_folders:
+        Path(folder_path).mkdir(parents=True, exist_ok=True)
+        _ensured_folders.add(folder_path)
+    
+    # Add timestamp to filename
+    suffix = f"_{attempt}" if attempt else ""
+    safe_filename = f"{now.strftime('%H%M%S')}_{sku}{suffix}.pdf"
+    return os.path.join(folder_path, safe_filename)
+
+
+def create_label_file(sku):
+    """
+    Create the file for a newly downloaded label; returns (path, fd).
+    Never reuses an existing file: two jobs for the same SKU saved in the
+    same second (job_pool runs them side by side) get _1, _2... names.
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL
+    attempt = 0
+    folder_recreated = False
+    while True:
+        pdf_path = new_label_path(sku, attempt)
+        try:
+            return pdf_path, os.open(pdf_path, flags, 0o644)
+        except FileExistsError:
+            attempt += 1
+        except FileNotFoundError:
+            if folder_recreated:
+                raise
+            # The date folder was deleted after we made it - make it again
+            _ensured_folders.discard(os.path.dirname(pdf_path))
+            folder_recreated = True
 
 
 def save_pdf_from_base64(pdf_base64, filename, sku):
     """Decode base64 PDF and save to labels folder"""
     try:
         pdf_data = base64.b64decode(pdf_base64)
-        
-        # Create dated subfolder
-        date_folder = datetime.now().strftime("%Y-%m-%d")
-        folder_path = os.path.join(LABELS_FOLDER, date_folder)
-        Path(folder_path).mkdir(parents=True, exist_ok=True)
-        
-        # Add timestamp to filename
-        timestamp = datetime.now().strftime("%H%M%S")
-        safe_filename = f"{timestamp}_{sku}.pdf"
-        pdf_path = os.path.join(folder_path, safe_filename)
-        
-        with open(pdf_path, 'wb') as f:
-            f.write(pdf_data)
+        pdf_path, fd = create_label_file(sku)
+        write_bytes(fd, pdf_data)
         
         return pdf_path
     except Exception as e:
@@ -892,16 +976,38 @@ def save_pdf_from_base64(pdf_base64, filename, sku):
         return None
 
 
+def download_pdf(job_id, sku):
+    """Stream a job's PDF from the server into the labels folder, chunk by chunk"""
+    pdf_path = None
+    try:
+        with SESSION.get(
+            f"{SERVER_URL.rstrip('/')}/api/print-jobs/{job_id}/pdf",
+            stream=True,
+            timeout=(10, 60)
+        ) as response:
+            if response.status_code != 200:
+                print(f"⚠️  Error downloading PDF: {response.status_code}")
+                return None
+            
+            pdf_path, fd = create_label_file(sku)
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+        
+        return pdf_path
+    except Exception as e:
+        print(f"⚠️  Error downloading PDF: {e}")
+        # Don't leave a truncated label behind
+        if pdf_path and os.path.exists(pdf_path):
+            os.remove(pdf_path)
+        return None
+
+
 def mark_job_downloaded(job_id):
     """Notify server that job was downloaded"""
     try:
-        headers = {}
-        if API_KEY:
-            headers['X-API-Key'] = API_KEY
-        
-        response = requests.post(
+        response = SESSION.post(
             f"{SERVER_URL.rstrip('/')}/api/print-jobs/{job_id}/complete",
-            headers=headers,
             json={'success': True, 'message': 'Downloaded to local agent'},
             timeout=10
         )
@@ -911,26 +1017,80 @@ def mark_job_downloaded(job_id):
         return False
 
 
+def mark_job_failed(job_id, message):
+    """Notify server that a job could not be saved, taking it off the queue"""
+    try:
+        response = SESSION.post(
+            f"{SERVER_URL.rstrip('/')}/api/print-jobs/{job_id}/complete",
+            json={'success': False, 'message': message},
+            timeout=10
+        )
+        return response.status_code == 200
+    except Exception as e:
+        print(f"⚠️  Failed to mark job failed: {e}")
+        return False
+
+
+def mark_jobs_downloaded(job_ids):
+    """Notify server that several jobs were downloaded, in one request if it can"""
+    global bulk_ack_supported
+    if bulk_ack_supported:
+        try:
+            response = SESSION.post(
+                f"{SERVER_URL.rstrip('/')}/api/print-jobs/complete",
+                json={'ids': job_ids},
+                timeout=15
+            )
+            if response.status_code != 404:
+                return response.status_code == 200
+            # Older server without the bulk endpoint: ack one by one from now on
+            bulk_ack_supported = False
+        except Exception as e:
+            print(f"⚠️  Failed to mark jobs downloaded: {e}")
+            return False
+    
+    return all([mark_job_downloaded(job_id) for job_id in job_ids])
+
+
 def process_job(job):
-    """Process a single print job - download and save only (no auto-print)"""
+    """
+    Process a single print job - download and save only (no auto-print)
+    
+    Returns:
+        True once the job is dealt with (saved, or unusable) and should be
+        acknowledged; False to leave it pending for the next poll; None if
+        it was given up on and reported failed (see download_failed)
+    """
     job_id = job['id']
-    pdf_base64 = job.get('pdf_data')
     filename = job.get('pdf_filename', f'{job_id}.pdf')
     sku = job.get('sku', 'unknown')
     tire_data = job.get('product_data', {})  # tire data is stored as product_data
     
-    print(f"📥 Downloading: {sku}")
+    # Sent again (e.g. our acknowledgement was lost) after we already saved it
+    saved_path = _saved_jobs.get(job_id)
+    if saved_path and os.path.exists(saved_path):
+        print(f"♻️  Already saved: {saved_path}")
+        return True
     
-    if not pdf_base64:
-        print(f"❌ No PDF data in job")
-        mark_job_downloaded(job_id)
-        return False
+    print(f"📥 Downloading: {sku}")
     
-    # Save PDF to labels folder
-    pdf_path = save_pdf_from_base64(pdf_base64, filename, sku)
-    if not pdf_path:
-        mark_job_downloaded(job_id)
-        return False
+    if 'pdf_data' not in job:
+        # The job list came without PDFs: fetch this one as a binary stream.
+        # On failure the job stays pending and is retried on a later poll.
+        pdf_path = download_pdf(job_id, sku)
+        if not pdf_path:
+            return download_failed(job_id)
+    else:
+        # Older server: the PDF is embedded in the job as base64
+        pdf_base64 = job['pdf_data']
+        if not pdf_base64:
+            print(f"❌ No PDF data in job")
+            return True
+        
+        # Save PDF to labels folder
+        pdf_path = save_pdf_from_base64(pdf_base64, filename, sku)
+        if not pdf_path:
+            return True
     
     # Save label data as JSON for editing
     if tire_data and pdf_path:
@@ -941,43 +1101,140 @@ def process_job(job):
         except Exception as e:
             print(f"⚠️  Could not save JSON data: {e}")
     
+    labels_changed()
     print(f"💾 Saved: {pdf_path}")
-    
-    # Mark as downloaded on server (removes from pending queue)
-    mark_job_downloaded(job_id)
+    _saved_jobs[job_id] = pdf_path
     
     return True
 
 
+def forget_jobs(job_ids):
+    """Drop the bookkeeping for jobs the server has acknowledged"""
+    for job_id in job_ids:
+        _saved_jobs.pop(job_id, None)
+        _download_failures.pop(job_id, None)
+
+
+def download_failed(job_id):
+    """
+    Count a failed download of a job: False to retry it on a later poll, or
+    None once it has failed MAX_DOWNLOAD_ATTEMPTS times and was reported failed
+    """
+    attempts = _download_failures.get(job_id, 0) + 1
+    if attempts < MAX_DOWNLOAD_ATTEMPTS:
+        _download_failures[job_id] = attempts
+        return False
+    
+    _download_failures.pop(job_id, None)
+    print(f"❌ Giving up on job {job_id} after {attempts} failed downloads")
+    mark_job_failed(job_id, f"Download failed {attempts} times")
+    return None
+
+
+def printer_state():
+    """
+    Return 'enabled' or 'disabled' for the configured printer, or None if
+    CUPS doesn't know it (or isn't running). CUPS is only asked again once
+    the cached answer is older than PRINTER_CHECK_TTL seconds.
+    """
+    checked_at, state = _printer_check
+    now = time.monotonic()
+    if checked_at and now - checked_at < PRINTER_CHECK_TTL:
+        return state
+    
+    state = query_printer_state()
+    _printer_check[:] = [now, state]
+    return state
+
+
+def query_printer_state():
+    """Ask CUPS for the printer state (see printer_state), via pycups if installed"""
+    if cups is not None:
+        try:
+            printer = cups.Connection().getPrinters().get(PRINTER_NAME)
+        except Exception:
+            return None
+        if printer is None:
+            return None
+        # IPP printer-state 5 is "stopped", what lpstat reports as disabled
+        return 'disabled' if printer['printer-state'] == 5 else 'enabled'
+    
+    try:
+        # Force English output so the 'enabled' check works on any locale
+        result = subprocess.run(['lpstat', '-p', PRINTER_NAME], capture_output=True, text=True,
+                                env={**os.environ, 'LC_ALL': 'C'})
+        if result.returncode != 0:
+            state = None
+        elif 'enabled' in result.stdout.lower():
+            state = 'enabled'
+        else:
+            state = 'disabled'
+    except Exception:
+        state = None
+    return state
+
+
 def check_printer():
     """Check if configured printer is available"""
-    try:
-        result = subprocess.run(['lpstat', '-p', PRINTER_NAME], capture_output=True, text=True)
-        if result.returncode == 0 and 'enabled' in result.stdout.lower():
-            return True
-        return False
-    except:
-        return False
+    return printer_state() == 'enabled'
 
 
 def poll_loop():
     """Background thread to poll for print jobs"""
     global pending_on_server
+    consecutive_failures = 0
     while True:
         try:
+            started = time.monotonic()
             jobs = get_pending_jobs()
             
+            if jobs is None:
+                # Server down or refusing us: back off exponentially (with
+                # jitter) instead of retrying every POLL_INTERVAL
+                consecutive_failures += 1
+                time.sleep(poll_backoff(consecutive_failures))
+                continue
+            
             if jobs:
                 print(f"📋 Found {len(jobs)} new label(s)")
-                for job in jobs:
-                    process_job(job)
+                # Download and save several jobs at once
+                done = list(job_pool.map(process_job, jobs))
+                
+                # Mark as downloaded on server (removes from pending queue),
+                # one request for the whole batch
+                job_ids = [job['id'] for job, ok in zip(jobs, done) if ok]
+                acked = bool(job_ids) and mark_jobs_downloaded(job_ids)
+                if acked:
+                    forget_jobs(job_ids)
                 pending_on_server = 0
-            
-            time.sleep(POLL_INTERVAL)
+                
+                if job_ids and not acked:
+                    # The ack POST isn't retried for us; the whole batch is
+                    # still pending, so back off as for a failed poll
+                    consecutive_failures += 1
+                    time.sleep(poll_backoff(consecutive_failures))
+                    continue
+                consecutive_failures = 0
+                
+                if False in done:
+                    # Jobs left pending come straight back from the next
+                    # long-poll, so pace the retry instead of spinning
+                    time.sleep(poll_backoff(consecutive_failures))
+            else:
+                consecutive_failures = 0
+                # A long-polling server already waited for us; one that
+                # answers straight away (older server, error) is paced here
+                time.sleep(max(0, POLL_INTERVAL - (time.monotonic() - started)))
             
         except Exception as e:
             print(f"⚠️  Error: {e}")
-            time.sleep(POLL_INTERVAL)
+            consecutive_failures += 1
+            time.sleep(poll_backoff(consecutive_failures))
+
+
+def poll_backoff(failures):
+    """Seconds to wait after the given number of consecutive poll failures"""
+    return min(MAX_POLL_BACKOFF, POLL_INTERVAL * 2 ** failures) + random.uniform(0, 1)
 
 
 def main():
@@ -994,6 +1251,7 @@ def main():
     
     # Ensure folders exist
     ensure_folders()
+    watch_labels_folder()
     
     # Check printer
     if check_printer():
@@ -1011,8 +1269,9 @@ def main():
     poll_thread = threading.Thread(target=poll_loop, daemon=True)
     poll_thread.start()
     
-    # Run Flask web interface
-    app.run(host='127.0.0.1', port=LOCAL_PORT, debug=False, use_reloader=False)
+    # Run Flask web interface, one thread per request so print, archive and
+    # PDF downloads fired together by the UI don't queue behind each other
+    app.run(host='127.0.0.1', port=LOCAL_PORT, debug=False, use_reloader=False, threaded=True)
 
 
 if __name__ == "__main__":
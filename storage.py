@@ -1,17 +1,139 @@
 """
 Storage module for print job management
 
-Simple in-memory storage that embeds PDF data directly in jobs.
+Simple storage that embeds PDF data directly in jobs. Pending jobs are
+kept in memory; once the agent reports on a job it moves to a small SQLite
+database (PRINT_JOBS_DB), so memory only grows with the pending queue.
 No external cloud storage required.
+
+PDFs are kept gzip-compressed (level 1, cheap and still ~20% smaller than
+ReportLab's own output); they are only decompressed and base64-encoded when
+a job is handed out with its PDF (for JSON responses).
 """
 
+import gzip
+import heapq
+import json
+import logging
+import mmap
 import os
-import base64
-from datetime import datetime, timedelta
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import count, islice
+
+# pybase64 is a drop-in, SIMD-accelerated base64 (optional)
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# Encode straight to str where possible, so a PDF being sent as JSON isn't
+# held as encoded bytes and an encoded str at the same time
+b64encode_str = getattr(base64, 'b64encode_as_string', None) or (
+    lambda data: base64.b64encode(data).decode('ascii')
+)
+
+log = logging.getLogger(__name__)
 
-# In-memory print job queue
+
+@dataclass(slots=True)
+class PrintJob:
+    """A print job's metadata (a pending job's PDF is kept in _pdf_blobs)"""
+    id: str
+    pdf_filename: str
+    sku: str
+    product_data: dict
+    status: str  # pending -> downloaded | failed (in the database) -> cleared
+    created_at: float  # epoch seconds, see job_for_json
+    downloaded_at: float | None = None
+    printer: str | None = None
+    error: str | None = None
+    
+    def to_dict(self):
+        """Shallow dict of the fields, in declaration order"""
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    def to_row(self):
+        """The job as a finished_jobs row (columns in field order)"""
+        row = [getattr(self, name) for name in self.__slots__]
+        row[3] = json.dumps(self.product_data, default=str)
+        return row
+    
+    @classmethod
+    def from_row(cls, row):
+        """Rebuild a job from a finished_jobs row"""
+        job = cls(*row)
+        job.product_data = json.loads(job.product_data)
+        return job
+
+
+# Pending print jobs, oldest first (metadata only)
 print_jobs = {}
 
+# PDFs of pending jobs, gzip-compressed, by job ID; dropped once downloaded
+_pdf_blobs = {}
+
+# Each job's JSON-ready dict, by job ID: built on first read, dropped when
+# the job changes. Handed out as-is to every caller, so never modify one.
+_json_views = {}
+
+# Sequence number in job IDs, so two jobs queued in the same tick don't collide
+_job_seq = count()
+
+# Held for every change to print_jobs, _pdf_blobs and the database (and
+# while copying a job), so a reader never sees a job half-updated
+_lock = threading.Lock()
+
+# Notified whenever a job is queued, so long-polling agents wake up at once
+_jobs_available = threading.Condition(_lock)
+
+# Finished (downloaded or failed) jobs, one row per job
+PRINT_JOBS_DB = os.getenv('PRINT_JOBS_DB', 'print_jobs.db')
+_COLUMNS = ', '.join(PrintJob.__slots__)
+# Finished jobs kept: the oldest beyond MAX_FINISHED_JOBS are pruned at
+# startup and every PRUNE_EVERY completions
+MAX_FINISHED_JOBS = 10000
+PRUNE_EVERY = 100
+_completions = count(1)
+
+_INSERT_JOB = f"INSERT OR REPLACE INTO finished_jobs ({_COLUMNS}) VALUES ({', '.join('?' * len(PrintJob.__slots__))})"
+
+
+def open_jobs_db(path):
+    """Open (creating if needed) the finished-jobs database"""
+    db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute('PRAGMA synchronous=NORMAL')
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS finished_jobs (
+            id TEXT PRIMARY KEY, pdf_filename TEXT, sku TEXT, product_data TEXT,
+            status TEXT, created_at REAL, downloaded_at REAL, printer TEXT, error TEXT
+        )
+    """)
+    db.execute('CREATE INDEX IF NOT EXISTS finished_jobs_created_at ON finished_jobs (created_at)')
+    db.execute('CREATE INDEX IF NOT EXISTS finished_jobs_status ON finished_jobs (status)')
+    prune_finished_jobs(db)
+    return db
+
+
+def prune_finished_jobs(db):
+    """Delete all but the newest MAX_FINISHED_JOBS finished jobs (call with _lock held once running)"""
+    db.execute(
+        'DELETE FROM finished_jobs WHERE created_at <= '
+        '(SELECT created_at FROM finished_jobs ORDER BY created_at DESC LIMIT 1 OFFSET ?)',
+        (MAX_FINISHED_JOBS,)
+    )
+
+
+try:
+    _db = open_jobs_db(PRINT_JOBS_DB)
+except sqlite3.Error as e:
+    log.warning("Could not open %s (%s); finished jobs kept in memory only", PRINT_JOBS_DB, e)
+    _db = open_jobs_db(':memory:')
+
 
 def create_print_job_with_pdf(pdf_path, sku, product_data=None):
     """
@@ -25,26 +147,31 @@ def create_print_job_with_pdf(pdf_path, sku, product_data=None):
     Returns:
         Job ID
     """
-    job_id = f"job_{datetime.now().strftime('%Y%m%d%H%M%S')}_{sku}"
+    now_ns = time.time_ns()
+    job_id = f"job_{now_ns:x}_{next(_job_seq)}_{sku}"
     
-    # Read and encode PDF as base64
+    # Compress the PDF straight from a memory map of the file, without a
+    # bytes copy of it first (encoded lazily, see job_for_json)
     with open(pdf_path, 'rb') as f:
-        pdf_base64 = base64.b64encode(f.read()).decode('utf-8')
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as pdf_map:
+                pdf_gzip = gzip.compress(pdf_map, compresslevel=1, mtime=0)
+        else:
+            pdf_gzip = gzip.compress(b'', compresslevel=1, mtime=0)  # mmap can't map empty files
     
-    print_jobs[job_id] = {
-        'id': job_id,
-        'pdf_data': pdf_base64,  # Embedded PDF
-        'pdf_filename': os.path.basename(pdf_path),
-        'sku': sku,
-        'product_data': product_data or {},
-        'status': 'pending',  # pending -> downloaded -> cleared
-        'created_at': datetime.now().isoformat(),
-        'downloaded_at': None,
-        'printer': None,
-        'error': None
-    }
+    with _jobs_available:
+        print_jobs[job_id] = PrintJob(
+            id=job_id,
+            pdf_filename=pdf_path.rpartition(os.sep)[2],
+            sku=sku,
+            product_data=product_data or {},
+            status='pending',
+            created_at=now_ns / 1e9
+        )
+        _pdf_blobs[job_id] = pdf_gzip
+        _jobs_available.notify_all()
     
-    print(f"📋 Created print job: {job_id} (SKU: {sku})")
+    log.info("Created print job: %s (SKU: %s)", job_id, sku)
     return job_id
 
 
@@ -53,82 +180,166 @@ def get_pending_jobs(include_pdf=True):
     Get all pending print jobs (not yet downloaded by agent)
     
     Args:
-        include_pdf: If True, include PDF data in response
+        include_pdf: If True, include PDF data (base64) in response
+    """
+    with _lock:
+        jobs = list(print_jobs.values())
+    return [job_for_json(job, include_pdf) for job in jobs]
+
+
+def wait_for_pending_jobs(timeout):
     """
-    jobs = []
-    for job in print_jobs.values():
-        if job['status'] == 'pending':
-            if include_pdf:
-                jobs.append(job)
-            else:
-                # Return job without PDF data (for listing)
-                job_copy = {k: v for k, v in job.items() if k != 'pdf_data'}
-                jobs.append(job_copy)
-    return jobs
+    Block until at least one job is pending or timeout seconds have passed
+    
+    Returns:
+        True if there are pending jobs
+    """
+    with _jobs_available:
+        return _jobs_available.wait_for(get_pending_count, timeout) > 0
 
 
 def get_job(job_id, include_pdf=True):
     """Get a specific job by ID"""
-    job = print_jobs.get(job_id)
-    if job and not include_pdf:
-        return {k: v for k, v in job.items() if k != 'pdf_data'}
+    with _lock:
+        job = print_jobs.get(job_id) or find_finished_job(job_id)
+    if job:
+        return job_for_json(job, include_pdf)
     return job
 
 
+def job_for_json(job, include_pdf=False):
+    """
+    A job ready for JSON: timestamps as ISO strings, and the PDF
+    base64-encoded (include_pdf) or left out (for listing).
+    Without the PDF this is the job's shared view, so treat it as read-only.
+    """
+    view = job_view(job)
+    if include_pdf:
+        pdf_bytes = get_job_pdf(job.id)
+        return {**view, 'pdf_data': b64encode_str(pdf_bytes) if pdf_bytes else None}
+    return view
+
+
+def job_view(job):
+    """The cached JSON-ready dict of a job, built if needed"""
+    with _lock:
+        view = _json_views.get(job.id)
+        if view is None:
+            view = job.to_dict()
+            view['created_at'] = isoformat(job.created_at)
+            view['downloaded_at'] = isoformat(job.downloaded_at)
+            if print_jobs.get(job.id) is job:  # only pending jobs are cached
+                _json_views[job.id] = view
+    return view
+
+
+def isoformat(timestamp):
+    """Epoch seconds as a local ISO-format string (None stays None)"""
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+def get_job_pdf(job_id):
+    """Get a job's PDF as bytes, or None if the job is unknown or already downloaded"""
+    pdf_gzip = _pdf_blobs.get(job_id)
+    return gzip.decompress(pdf_gzip) if pdf_gzip else None
+
+
+def get_job_pdf_gzip(job_id):
+    """Get a job's PDF gzip-compressed, as stored (or None, like get_job_pdf)"""
+    return _pdf_blobs.get(job_id)
+
+
 def mark_job_downloaded(job_id):
     """
     Mark a job as downloaded (saved locally by agent)
-    Job stays in list but PDF data is cleared to save memory
+    Job moves to the database and its PDF data is dropped to save memory
+    """
+    return complete_job(job_id)
+
+
+def complete_job(job_id, success=True, message="", printer=None):
+    """
+    Record the agent's report on a job: 'downloaded', or 'failed' with the
+    message kept as its error. Either way the job leaves the pending queue
+    for the database, and its PDF data is dropped to save memory. A job that
+    already finished is updated in place.
     """
-    if job_id not in print_jobs:
-        return False
+    status = 'downloaded' if success else 'failed'
+    error = None if success else (message or 'Failed')
     
-    print_jobs[job_id]['status'] = 'downloaded'
-    print_jobs[job_id]['downloaded_at'] = datetime.now().isoformat()
-    print_jobs[job_id]['pdf_data'] = None  # Free memory
+    with _lock:
+        job = print_jobs.pop(job_id, None)
+        if job is None:
+            updated = _db.execute(
+                'UPDATE finished_jobs SET status = ?, downloaded_at = ?, printer = ?, error = ? WHERE id = ?',
+                (status, time.time(), printer or None, error, job_id)
+            )
+            if not updated.rowcount:
+                return False
+        else:
+            _pdf_blobs.pop(job_id, None)  # Free memory
+            _json_views.pop(job_id, None)
+            job.status = status
+            job.downloaded_at = time.time()
+            job.printer = printer or None
+            job.error = error
+            _db.execute(_INSERT_JOB, job.to_row())
+            if next(_completions) % PRUNE_EVERY == 0:
+                prune_finished_jobs(_db)
     
-    print(f"✅ Downloaded: Job {job_id}")
+    if success:
+        log.info("Downloaded: Job %s", job_id)
+    else:
+        log.warning("Failed: Job %s (%s)", job_id, error)
     return True
 
 
-def complete_job(job_id, success=True, message="", printer=None):
+def find_finished_job(job_id):
+    """Load a finished job from the database, or None (call with _lock held)"""
+    row = _db.execute(f'SELECT {_COLUMNS} FROM finished_jobs WHERE id = ?', (job_id,)).fetchone()
+    return PrintJob.from_row(row) if row else None
+
+
+def complete_jobs(job_ids):
     """
-    Mark a job as downloaded (keeping backward compatibility)
+    Mark several jobs as downloaded at once
+    
+    Returns:
+        IDs of the jobs that were found and marked
     """
-    return mark_job_downloaded(job_id)
+    return [job_id for job_id in job_ids if mark_job_downloaded(job_id)]
 
 
 def get_all_jobs(limit=50):
-    """Get all jobs (without PDF data), sorted by creation time"""
-    jobs = []
-    for job in print_jobs.values():
-        job_copy = {k: v for k, v in job.items() if k != 'pdf_data'}
-        jobs.append(job_copy)
-    jobs.sort(key=lambda x: x['created_at'], reverse=True)
-    return jobs[:limit]
+    """Get all jobs (without PDF data), newest first"""
+    # print_jobs is in creation order and the database query is sorted, so
+    # the newest of both are merged without a sort
+    with _lock:
+        pending = list(islice(reversed(print_jobs.values()), limit))
+        finished = [PrintJob.from_row(row) for row in _db.execute(
+            f'SELECT {_COLUMNS} FROM finished_jobs ORDER BY created_at DESC LIMIT ?', (limit,)
+        )]
+    jobs = heapq.merge(pending, finished, key=lambda job: job.created_at, reverse=True)
+    return [job_for_json(job) for job in islice(jobs, limit)]
 
 
 def clear_downloaded_jobs():
-    """Remove all downloaded jobs to free memory"""
-    to_remove = [
-        job_id for job_id, job in print_jobs.items()
-        if job['status'] == 'downloaded'
-    ]
-    
-    for job_id in to_remove:
-        del print_jobs[job_id]
+    """Remove all downloaded (and failed) jobs from the database"""
+    with _lock:
+        cleared = _db.execute('DELETE FROM finished_jobs').rowcount
     
-    if to_remove:
-        print(f"🧹 Cleared {len(to_remove)} downloaded jobs")
+    if cleared:
+        log.info("Cleared %d downloaded jobs", cleared)
     
-    return len(to_remove)
+    return cleared
 
 
 def get_pending_count():
     """Get count of pending jobs (not yet downloaded)"""
-    return sum(1 for job in print_jobs.values() if job['status'] == 'pending')
+    return len(print_jobs)
 
 
 def get_downloaded_count():
     """Get count of downloaded jobs"""
-    return sum(1 for job in print_jobs.values() if job['status'] == 'downloaded')
+    with _lock:
+        return _db.execute("SELECT COUNT(*) FROM finished_jobs WHERE status = 'downloaded'").fetchone()[0]